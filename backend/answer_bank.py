@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import numpy as np
+from safety_filter import compile_matcher, normalize
+from metrics import CACHE_EVENTS
+
+INTENTS_PATH = os.getenv("INTENTS_PATH", "../data/first_aid/intents.json")
+ANSWER_BANK_PATH = os.getenv("ANSWER_BANK_PATH", "../data/first_aid/answer_bank.json")
+# A keyword match alone is not enough: the question must also be this
+# similar (cosine) to one of the intent's example questions
+ANSWER_BANK_MIN_SIM = float(os.getenv("ANSWER_BANK_MIN_SIM", "0.8"))
+
+_matcher = None
+_keyword_intents = {}
+_answers = {}
+_intents = []
+
+_question_vectors = None
+_question_intents = None
+_embed_lock = threading.Lock()
+
+
+def load_intents(path=INTENTS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load(intents_path=INTENTS_PATH, bank_path=ANSWER_BANK_PATH):
+    """
+    Compile the keywords of every intent (all languages) into one matcher
+    and load the pre-generated answers. A missing bank just disables it.
+    """
+    global _matcher, _keyword_intents, _answers, _intents, _question_vectors
+
+    try:
+        intents = load_intents(intents_path)
+        with open(bank_path, encoding="utf-8") as f:
+            answers = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"ℹ Answer bank not loaded: {e}")
+        _matcher, _keyword_intents, _answers, _intents = None, {}, {}, []
+        _question_vectors = None
+        return
+
+    keyword_intents = {}
+    for intent in intents:
+        for words in intent["keywords"].values():
+            for word in words:
+                keyword_intents[normalize(word)] = intent["id"]
+
+    _keyword_intents = keyword_intents
+    _answers = answers
+    _intents = intents
+    _question_vectors = None
+    _matcher = compile_matcher(keyword_intents)
+    print(f"✅ Answer bank loaded for {len(answers)} intents.")
+
+
+def load_question_embeddings(embedder):
+    """
+    Embed the example questions of every intent (all languages) once.
+    Until this has run, lookup() serves nothing.
+    """
+    global _question_vectors, _question_intents
+
+    with _embed_lock:
+        if _question_vectors is not None or not _intents:
+            return
+        texts, owners = [], []
+        for intent in _intents:
+            questions = [intent["question"]]
+            for per_lang in intent.get("questions", {}).values():
+                questions.extend(per_lang)
+            texts.extend(questions)
+            owners.extend([intent["id"]] * len(questions))
+
+        vectors = np.asarray(embedder.encode(texts, convert_to_numpy=True), dtype="float32")
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        _question_intents = np.array(owners)
+        _question_vectors = vectors
+
+
+def intent_similarity(intent: str, q_embed) -> float:
+    """
+    Highest cosine similarity between the question embedding and the
+    intent's example questions.
+    """
+    vectors, owners = _question_vectors, _question_intents
+    if vectors is None:
+        return 0.0
+    q = np.asarray(q_embed, dtype="float32").reshape(-1)
+    sims = vectors[owners == intent] @ (q / np.linalg.norm(q))
+    return float(sims.max()) if sims.size else 0.0
+
+
+def match_intent(question: str):
+    """
+    Return the single intent the question is about, or None when no
+    keyword or keywords of more than one intent match.
+    """
+    if _matcher is None:
+        return None
+    found = {_keyword_intents.get(m.group(0)) for m in _matcher.finditer(normalize(question))}
+    found.discard(None)
+    return found.pop() if len(found) == 1 else None
+
+
+def lookup(question: str, lang_code: str, q_embed):
+    """
+    Serve a vetted pre-generated answer for the question, if there is one.
+    Keywords pick the intent; the question embedding must then be close to
+    one of its example questions, so questions that merely mention the
+    same words (e.g. eyes burning from smoke) still go to the LLM.
+    """
+    intent = match_intent(question)
+    entry = _answers.get(intent, {}).get(lang_code) if intent else None
+    if entry and intent_similarity(intent, q_embed) < ANSWER_BANK_MIN_SIM:
+        entry = None
+
+    if not entry or not entry.get("vetted"):
+        CACHE_EVENTS.inc(cache="answer_bank", result="miss")
+        return None
+
+    CACHE_EVENTS.inc(cache="answer_bank", result="hit")
+    return {"text": entry["text"], "table": entry["table"], "intent": intent}
+
+
+load()
@@ -0,0 +1,101 @@
+"""
+Micro-benchmarks for the hot functions of the backend.
+
+Run from the backend directory (the index paths are relative to it):
+    python -m benchmarks.bench_micro --out results/micro.json
+    python -m benchmarks.bench_micro --only safety_check,format_as_table
+
+retrieve and translate_text load the real embedder, FAISS index and
+MarianMT models, which must already be in the local model cache.
+"""
+import argparse
+
+from benchmarks import stubs
+from benchmarks.harness import measure, print_table, write_results
+
+QUESTIONS = [
+    "How do I stop heavy bleeding from a leg wound?",
+    "What should I do for a second-degree burn?",
+    "How do I give CPR to an adult?",
+]
+
+
+def bench_safety_check():
+    from safety_filter import safety_check
+    return lambda: [safety_check(q) for q in QUESTIONS]
+
+
+def bench_ration_all():
+    from ration_service import ration_all
+    resources = {"water_l": 500, "food_kcal": 210000, "food_items": "rice, lentils", "medicine_units": 120}
+    return lambda: ration_all(resources, 25, 7)
+
+
+def bench_clean_answer():
+    from rag_pipeline import clean_answer
+    text = "Thinking about the context...\nWe must answer.\n" + stubs.STUB_ANSWER * 3
+    return lambda: clean_answer(text)
+
+
+def bench_format_as_table():
+    from rag_pipeline import format_as_table
+    text = stubs.STUB_ANSWER * 3
+    return lambda: format_as_table(text)
+
+
+def bench_retrieve():
+    from rag_pipeline import retrieve
+    return lambda: retrieve(QUESTIONS[0], k=3)
+
+
+def bench_hybrid_context():
+    from rag_pipeline import CONTEXT_TOKEN_BUDGET, bm25, embed_query, hybrid_search
+    from hybrid_retrieval import pack_context
+    q_embed = embed_query(QUESTIONS[0])
+
+    def run():
+        chunks = hybrid_search(QUESTIONS[0], q_embed)
+        return pack_context(QUESTIONS[0], chunks, CONTEXT_TOKEN_BUDGET, bm25.idf)
+    return run
+
+
+def bench_translate_text():
+    from utils.translation_service import translate_text
+    translate_text("warmup", src="en", dest="hi")
+    return lambda: translate_text(QUESTIONS[0], src="en", dest="hi")
+
+
+BENCHMARKS = {
+    "safety_check": (bench_safety_check, 2000),
+    "ration_all": (bench_ration_all, 5000),
+    "clean_answer": (bench_clean_answer, 2000),
+    "format_as_table": (bench_format_as_table, 5000),
+    "retrieve": (bench_retrieve, 200),
+    "hybrid_context": (bench_hybrid_context, 500),
+    "translate_text": (bench_translate_text, 20),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run backend micro-benchmarks.")
+    parser.add_argument("--only", type=str, default="", help="Comma-separated benchmark names.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply iteration counts.")
+    parser.add_argument("--out", type=str, default="", help="Write JSON results to this path.")
+    args = parser.parse_args()
+
+    stubs.install()
+
+    selected = [n.strip() for n in args.only.split(",") if n.strip()] or list(BENCHMARKS)
+    results = {}
+    for name in selected:
+        setup, iterations = BENCHMARKS[name]
+        fn = setup()
+        results[name] = measure(fn, iterations=max(1, int(iterations * args.scale)))
+
+    print_table(results)
+    if args.out:
+        write_results(args.out, "micro", results, {"scale": args.scale, "only": selected})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare the compiled single-pass safety matcher against the old
+per-keyword regex loop.
+
+Run from the backend directory:
+    python -m benchmarks.bench_safety --terms 10000
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from safety_filter import BLOCKED_KEYWORDS, compile_matcher, normalize
+
+QUERIES = [
+    "How do I stop heavy bleeding from a leg wound?",
+    "My child has a high fever and is dehydrated, what should I do?",
+    "¿Cómo trato una quemadura de segundo grado?",
+    "كيف أساعد شخصا لا يتنفس؟",
+    "हड्डी टूटने पर क्या करें?",
+    "someone swallowed poison, what now",
+]
+
+
+def legacy_is_safe(query, terms):
+    q = query.lower()
+    for word in terms:
+        if re.search(rf"\b{re.escape(word)}\b", q):
+            return False
+    return True
+
+
+def synthetic_terms(n, seed=0):
+    rng = random.Random(seed)
+    terms = list(BLOCKED_KEYWORDS)
+    while len(terms) < n:
+        length = rng.randint(4, 12)
+        terms.append("".join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return terms
+
+
+def time_per_query(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the safety keyword matcher.")
+    parser.add_argument("--terms", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    terms = synthetic_terms(args.terms)
+
+    start = time.perf_counter()
+    matcher = compile_matcher(terms)
+    compile_s = time.perf_counter() - start
+
+    compiled = time_per_query(lambda q: matcher.search(normalize(q)) is None, args.rounds)
+    legacy = time_per_query(lambda q: legacy_is_safe(q, terms), max(1, args.rounds // 10))
+
+    print(f"terms: {len(terms)}")
+    print(f"compile: {compile_s * 1000:.1f} ms")
+    print(f"legacy loop: {legacy * 1000:.3f} ms/query")
+    print(f"compiled:    {compiled * 1000:.3f} ms/query ({legacy / compiled:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
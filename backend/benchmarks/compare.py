@@ -0,0 +1,52 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare results/base.json results/new.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms"]
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent.")
+    args = parser.parse_args()
+
+    base, cand = load(args.baseline), load(args.candidate)
+    print(f"baseline {base['commit']}  vs  candidate {cand['commit']}")
+
+    regressions = 0
+    for name, new in cand["results"].items():
+        old = base["results"].get(name)
+        if not old:
+            print(f"{name:<40} (new)")
+            continue
+        cells = []
+        for metric in METRICS:
+            before, after = old.get(metric, 0.0), new.get(metric, 0.0)
+            change = (after - before) / before * 100 if before else 0.0
+            flag = ""
+            if change > args.threshold:
+                flag = " ⚠"
+                regressions += 1
+            cells.append(f"{metric} {before:.3f}->{after:.3f} ({change:+.1f}%){flag}")
+        print(f"{name:<40} " + "  ".join(cells))
+
+    if regressions:
+        print(f"❌ {regressions} metric(s) regressed by more than {args.threshold}%")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compare retrieval with and without translating the query to English,
+for the dense FAISS ranking alone and for the hybrid (FAISS + BM25)
+ranking that ask_first_aid uses.
+
+For every labeled query it reports whether any of the top-k chunks
+contains an expected keyword (hit rate), the latency of query
+preparation plus retrieval, and optionally the end-to-end latency of
+ask_first_aid with Ollama stubbed. For the hybrid retriever, hit@ctx
+checks the packed context that actually goes into the prompt.
+
+Run from the backend directory:
+    python -m benchmarks.eval_retrieval --k 1,3 --end-to-end --out results/retrieval.json
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks import stubs
+from benchmarks.harness import summarize, write_results
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "data", "retrieval_queries.json")
+MODES = ["translate", "direct"]
+RETRIEVERS = ["dense", "hybrid"]
+
+
+def retrieve_chunks(rag_pipeline, retriever, query, k):
+    """
+    Top-k chunks and, for the hybrid retriever, the packed prompt context.
+    """
+    if retriever == "dense":
+        return rag_pipeline.retrieve(query, k=k), None
+    chunks = rag_pipeline.hybrid_search(query, rag_pipeline.embed_query(query),
+                                        k=max(k, rag_pipeline.HYBRID_CANDIDATES))
+    context = rag_pipeline.pack_context(query, chunks, rag_pipeline.CONTEXT_TOKEN_BUDGET,
+                                        rag_pipeline.bm25.idf)
+    return chunks, context
+
+
+def evaluate(mode, k_values, end_to_end, retriever="hybrid"):
+    import rag_pipeline
+
+    with open(QUERIES_PATH, encoding="utf-8") as f:
+        queries = json.load(f)
+
+    max_k = max(k_values)
+    hits = {k: {} for k in k_values}
+    context_hits = {}
+    latencies, e2e_latencies = {}, {}
+
+    for item in queries:
+        for lang, question in item["questions"].items():
+            t0 = time.perf_counter()
+            query = rag_pipeline.prepare_query(question, lang, mode=mode)
+            chunks, context = retrieve_chunks(rag_pipeline, retriever, query, max_k)
+            latencies.setdefault(lang, []).append(time.perf_counter() - t0)
+
+            for k in k_values:
+                text = " ".join(str(c) for c in chunks[:k]).lower()
+                hit = any(word in text for word in item["expect"])
+                hits[k].setdefault(lang, []).append(hit)
+            if context is not None:
+                hit = any(word in context.lower() for word in item["expect"])
+                context_hits.setdefault(lang, []).append(hit)
+
+            if end_to_end:
+                previous = rag_pipeline.RETRIEVAL_MODE
+                rag_pipeline.RETRIEVAL_MODE = mode
+                t0 = time.perf_counter()
+                rag_pipeline.ask_first_aid(question, lang)
+                e2e_latencies.setdefault(lang, []).append(time.perf_counter() - t0)
+                rag_pipeline.RETRIEVAL_MODE = previous
+
+    result = {}
+    for lang in latencies:
+        row = {f"hit@{k}": round(sum(hits[k][lang]) / len(hits[k][lang]), 3) for k in k_values}
+        if lang in context_hits:
+            row["hit@ctx"] = round(sum(context_hits[lang]) / len(context_hits[lang]), 3)
+        row["retrieval"] = summarize(latencies[lang])
+        if end_to_end:
+            row["end_to_end"] = summarize(e2e_latencies[lang])
+        result[lang] = row
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate direct vs translated multilingual retrieval.")
+    parser.add_argument("--k", type=str, default="1,3")
+    parser.add_argument("--retrievers", type=str, default=",".join(RETRIEVERS),
+                        help="Comma-separated: dense (FAISS only), hybrid (FAISS + BM25, as served).")
+    parser.add_argument("--end-to-end", action="store_true", help="Also time ask_first_aid with a stubbed LLM.")
+    parser.add_argument("--out", type=str, default="")
+    args = parser.parse_args()
+
+    stubs.install()
+    k_values = [int(k) for k in args.k.split(",")]
+    retrievers = [r.strip() for r in args.retrievers.split(",") if r.strip() in RETRIEVERS]
+
+    results = {}
+    for mode in MODES:
+        # Warm up models so load time is not attributed to the first mode
+        evaluate(mode, [1], False)
+        for i, retriever in enumerate(retrievers):
+            # End-to-end latency does not depend on the retriever evaluated; time it once
+            results[f"{mode}/{retriever}"] = evaluate(mode, k_values, args.end_to_end and i == 0, retriever)
+
+    for name, per_lang in results.items():
+        for lang, row in per_lang.items():
+            hit_cols = "  ".join(f"{key} {val:.2f}" for key, val in row.items() if key.startswith("hit@"))
+            line = f"{name:<17} {lang:<3} {hit_cols}  retrieval p50 {row['retrieval']['p50_ms']:.1f} ms"
+            if "end_to_end" in row:
+                line += f"  end-to-end p50 {row['end_to_end']['p50_ms']:.1f} ms"
+            print(line)
+
+    if args.out:
+        write_results(args.out, "retrieval", results,
+                      {"k": k_values, "retrievers": retrievers, "end_to_end": args.end_to_end})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Shared helpers for the benchmark scripts: timing loops, percentiles and
+machine-readable result files that can be compared across commits.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies, elapsed=None, errors=0) -> dict:
+    """
+    Latencies are in seconds; the summary reports milliseconds.
+    """
+    summary = {
+        "count": len(latencies),
+        "errors": errors,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 4) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 4),
+        "max_ms": round(max(latencies) * 1000, 4) if latencies else 0.0,
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(latencies) / elapsed, 3)
+    return summary
+
+
+def measure(fn, iterations=50, warmup=3) -> dict:
+    """
+    Call fn() repeatedly and summarize the per-call latency.
+    """
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=10
+        )
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def write_results(path, suite, results, params=None):
+    payload = {
+        "suite": suite,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "params": params or {},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"📄 Results written to {path}")
+    return payload
+
+
+def print_table(results):
+    for name, r in results.items():
+        extra = f"  {r['throughput_rps']:>9.2f} rps" if "throughput_rps" in r else ""
+        print(f"{name:<40} p50 {r['p50_ms']:>10.3f} ms  p95 {r['p95_ms']:>10.3f} ms  "
+              f"p99 {r['p99_ms']:>10.3f} ms{extra}")
@@ -0,0 +1,115 @@
+"""
+End-to-end load generator for the FastAPI app.
+
+By default the app is driven in-process with external services stubbed,
+so numbers are reproducible offline. Use --url to hit a running server
+instead (nothing is stubbed in that case).
+
+    python -m benchmarks.load_test --concurrency 1,4,16 --requests 64 --llm-delay 0.5 \
+        --out results/load.json
+"""
+import argparse
+import asyncio
+import io
+import time
+
+import httpx
+
+from benchmarks import stubs
+from benchmarks.harness import summarize, print_table, write_results
+
+# Keep a reference before stubs.install() swaps in the GraphHopper stub
+AsyncClient = httpx.AsyncClient
+
+ENDPOINTS = {
+    "first_aid": ("GET", "/first_aid", {"params": {"question": "How do I stop bleeding?", "lang": "English"}}),
+    "first_aid_hi": ("GET", "/first_aid", {"params": {"question": "खून बहना कैसे रोकें?", "lang": "हिन्दी"}}),
+    "ration_all": ("GET", "/ration_all", {"params": {"water_l": 100, "food_kcal": 50000, "people": 10, "days": 5}}),
+    "ration_all_explained": ("POST", "/ration_all_explained", {"json": {
+        "water_liters": 50, "food_items": "rice and beans", "medicines_units": 100,
+        "people_count": 10, "days_count": 5, "lang": "English"}}),
+    "safe_route": ("POST", "/safe_route", {"json": {
+        "region": "bengaluru", "start_lat": 12.9716, "start_lon": 77.5946,
+        "end_lat": 12.9345, "end_lon": 77.6265}}),
+    "misinformation": ("POST", "/misinformation", {}),
+}
+
+
+def flyer_image() -> bytes:
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+async def run_level(client, endpoint, concurrency, total):
+    method, path, kwargs = ENDPOINTS[endpoint]
+    latencies, errors, statuses = [], 0, {}
+    remaining = iter(range(total))
+
+    if endpoint == "misinformation":
+        image = flyer_image()
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            req_kwargs = dict(kwargs)
+            if endpoint == "misinformation":
+                req_kwargs["files"] = {"file": ("flyer.png", image, "image/png")}
+            t0 = time.perf_counter()
+            try:
+                response = await client.request(method, path, **req_kwargs)
+                status = response.status_code
+            except Exception:
+                status = "exception"
+            latencies.append(time.perf_counter() - t0)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(latencies, time.perf_counter() - start, errors)
+    summary["statuses"] = statuses
+    return summary
+
+
+async def run(args):
+    if args.url:
+        client = AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        stubs.install(llm_delay=args.llm_delay, route_delay=args.route_delay, ocr_delay=args.ocr_delay)
+        import main
+        transport = httpx.ASGITransport(app=main.app)
+        client = AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout)
+
+    results = {}
+    async with client:
+        for endpoint in args.endpoints.split(","):
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                name = f"{endpoint}@c{concurrency}"
+                results[name] = await run_level(client, endpoint, concurrency, args.requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the FirstResponse backend.")
+    parser.add_argument("--url", type=str, default="", help="Target a running server instead of in-process.")
+    parser.add_argument("--endpoints", type=str, default="first_aid,ration_all,safe_route")
+    parser.add_argument("--concurrency", type=str, default="1,4,16")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level.")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="Simulated Ollama latency (s).")
+    parser.add_argument("--route-delay", type=float, default=0.05, help="Simulated GraphHopper latency (s).")
+    parser.add_argument("--ocr-delay", type=float, default=0.1, help="Simulated Tesseract latency (s).")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--out", type=str, default="")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.out:
+        write_results(args.out, "load", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Offline stand-ins for the external services the backend talks to, so
+benchmarks measure our own code: Ollama (subprocess), GraphHopper
+(httpx/requests) and Tesseract (pytesseract).
+"""
+import io
+import json
+import subprocess
+import time
+
+STUB_ANSWER = """1. Make sure the area is safe before you help.
+2. Stop bleeding by applying firm pressure with a clean cloth.
+3. Clean the wound gently with clean water and cover it.
+4. Elevate the injured limb if there is no fracture.
+5. Monitor breathing and check the chest rises.
+6. Get medical help as soon as possible."""
+
+STUB_JSON_ANSWER = json.dumps({
+    "steps": [line.split(". ", 1)[1] for line in STUB_ANSWER.splitlines()],
+    "checklist": [
+        {"action": "Stop bleeding", "how": "Apply firm pressure with a clean cloth", "avoid": "Removing embedded objects"},
+        {"action": "Monitor", "how": "Watch breathing and responsiveness", "avoid": "Leaving the person alone"},
+    ],
+})
+
+STUB_VERDICT = "Verdict: Verified\nReason: Contains an official contact number."
+
+STUB_ROUTE = {
+    "paths": [{
+        "distance": 4210.0,
+        "time": 3030000,
+        "points": {"coordinates": [[77.5946 + i * 0.001, 12.9716 - i * 0.001] for i in range(50)]},
+        "instructions": [{"text": "Continue onto MG Road", "distance": 420.0}],
+    }]
+}
+
+STUB_OCR_TEXT = "Ministry of Health\nFree water distribution at the school, 10am.\nCall 112"
+
+_real_run = subprocess.run
+_real_popen = subprocess.Popen
+
+
+class _FakeOllamaProcess:
+    """
+    Minimal Popen stand-in for streamed `ollama run` calls.
+    """
+    def __init__(self, cmd, delay):
+        time.sleep(delay)
+        answer = STUB_JSON_ANSWER if "--format" in cmd else STUB_ANSWER
+        self.args = cmd
+        self.stdin = io.BytesIO()
+        self.stdout = io.BytesIO(answer.encode("utf-8"))
+        self.returncode = 0
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        pass
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+
+def install(llm_delay=0.0, route_delay=0.0, ocr_delay=0.0):
+    """
+    Patch the external calls in place. Delays simulate service latency.
+    """
+    def fake_run(cmd, *args, **kwargs):
+        if isinstance(cmd, (list, tuple)) and cmd and cmd[0] == "ollama":
+            time.sleep(llm_delay)
+            prompt = kwargs.get("input") or ""
+            stdout = STUB_VERDICT if "misinformation detector" in prompt else STUB_ANSWER
+            return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+        return _real_run(cmd, *args, **kwargs)
+
+    def fake_popen(cmd, *args, **kwargs):
+        if isinstance(cmd, (list, tuple)) and cmd and cmd[0] == "ollama":
+            return _FakeOllamaProcess(cmd, llm_delay)
+        return _real_popen(cmd, *args, **kwargs)
+
+    subprocess.run = fake_run
+    subprocess.Popen = fake_popen
+
+    try:
+        import pytesseract
+
+        def fake_ocr(*args, **kwargs):
+            time.sleep(ocr_delay)
+            return STUB_OCR_TEXT
+
+        pytesseract.image_to_string = fake_ocr
+    except ImportError:
+        pass
+
+    try:
+        import httpx
+
+        def handler(request):
+            time.sleep(route_delay)
+            return httpx.Response(200, json=STUB_ROUTE)
+
+        real_client = httpx.AsyncClient
+
+        class StubAsyncClient(real_client):
+            def __init__(self, *args, **kwargs):
+                kwargs["transport"] = httpx.MockTransport(handler)
+                super().__init__(*args, **kwargs)
+
+        httpx.AsyncClient = StubAsyncClient
+    except ImportError:
+        pass
+
+    try:
+        import requests
+
+        class StubResponse:
+            status_code = 200
+
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return json.loads(json.dumps(STUB_ROUTE))
+
+        def fake_get(*args, **kwargs):
+            time.sleep(route_delay)
+            return StubResponse()
+
+        requests.get = fake_get
+    except ImportError:
+        pass
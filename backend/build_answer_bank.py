@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+from answer_bank import ANSWER_BANK_PATH, load_intents
+from rag_pipeline import ask_first_aid
+from utils.translation_service import LANG_MAP
+
+def build_answer_bank(out_path, only=None, force=False):
+    """
+    Run the live pipeline once per intent and language and store the
+    answers. New entries are saved with "vetted": false and are not served
+    until a reviewer has checked them and set the flag to true.
+    """
+    try:
+        with open(out_path, encoding="utf-8") as f:
+            bank = json.load(f)
+    except (OSError, ValueError):
+        bank = {}
+
+    for intent in load_intents():
+        if only and intent["id"] not in only:
+            continue
+        entries = bank.setdefault(intent["id"], {})
+
+        for lang_code in sorted(set(LANG_MAP.values())):
+            if lang_code in entries and not force:
+                print(f"✅ {intent['id']}/{lang_code} already in bank. Skipping.")
+                continue
+
+            print(f"⏳ Generating {intent['id']}/{lang_code} ...")
+            result = ask_first_aid(intent["question"], lang_code)
+            if not result["text"] or result["text"].startswith("⚠") or result.get("incomplete"):
+                print(f"❌ Failed for {intent['id']}/{lang_code}: {result['text']}")
+                continue
+
+            entries[lang_code] = {
+                "text": result["text"],
+                "table": result["table"],
+                "vetted": False,
+            }
+
+            # Save after every answer so a crash loses at most one generation
+            tmp_path = out_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(bank, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, out_path)
+
+    pending = sum(1 for e in bank.values() for a in e.values() if not a.get("vetted"))
+    print(f"👍 Answer bank saved to {out_path} ({pending} entries awaiting review)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate first aid answers for the top emergencies.")
+    parser.add_argument("--out", type=str, default=ANSWER_BANK_PATH)
+    parser.add_argument("--only", type=str, default="", help="Comma-separated intent ids.")
+    parser.add_argument("--force", action="store_true", help="Regenerate entries that already exist.")
+    args = parser.parse_args()
+
+    only = {i.strip() for i in args.only.split(",") if i.strip()}
+    build_answer_bank(args.out, only, args.force)
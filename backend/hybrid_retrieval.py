@@ -0,0 +1,127 @@
+import math
+import re
+from collections import Counter, defaultdict
+from safety_filter import normalize
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "if", "in", "is", "it", "my", "of", "on", "or", "should", "so", "that",
+    "the", "their", "them", "there", "they", "this", "to", "was", "what", "when", "where",
+    "which", "who", "will", "with", "you", "your",
+}
+
+_TOKEN = re.compile(r"\w+")
+# PDF text has a newline after every printed line. Only blank lines and
+# lines starting a list item separate paragraphs; other line breaks are
+# joined back so that sentences are never cut at a line wrap.
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\n(?=[ \t]*(?:[-•*▪●]|\d{1,2}[.)])\s)")
+_LINE_BREAK = re.compile(r"\s*\n\s*")
+# Sentence punctuation, except the "1." / "12)" of a numbered step
+_SENTENCE_END = re.compile(r"(?<=[.!?])(?<!\b\d[.)])(?<!\b\d\d[.)])\s+")
+
+
+def tokenize(text: str):
+    return [t for t in _TOKEN.findall(normalize(text)) if t not in STOPWORDS and len(t) > 1]
+
+
+def approx_tokens(text: str) -> int:
+    # ~4 characters per token for English text in the usual LLM tokenizers
+    return max(1, math.ceil(len(text) / 4))
+
+
+class BM25:
+    """
+    Okapi BM25 over the manual chunks, kept as an inverted index so a query
+    only touches the postings of its own terms.
+    """
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_len = []
+
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(str(text)))
+            self.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((doc_id, tf))
+
+        n = len(self.doc_len)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def scores(self, query: str) -> dict:
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / (self.avg_len or 1))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def top(self, query: str, k: int):
+        scores = self.scores(query)
+        return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+def fuse(rankings, k=60) -> list:
+    """
+    Reciprocal rank fusion of several ranked lists of doc ids.
+    Returns (doc_id, score) pairs, best first.
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def split_sentences(text: str):
+    sentences = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = _LINE_BREAK.sub(" ", paragraph.strip())
+        sentences.extend(s.strip() for s in _SENTENCE_END.split(paragraph) if s.strip())
+    return sentences
+
+
+def pack_context(query: str, chunks, budget_tokens: int, idf=None) -> str:
+    """
+    Pick the best sentences from the ranked chunks within a token budget.
+    Only whole sentences are kept; one that does not fit is skipped.
+
+    Sentences repeated across chunks (CharacterTextSplitter overlaps them)
+    are kept once. A sentence scores by the query terms it contains plus a
+    bonus for coming from a higher-ranked chunk; the chosen sentences are
+    emitted in chunk and reading order so steps stay in sequence.
+    """
+    query_terms = set(tokenize(query))
+    idf = idf or {}
+
+    candidates = []
+    seen = set()
+    for chunk_rank, chunk in enumerate(chunks):
+        for position, sentence in enumerate(split_sentences(str(chunk))):
+            key = " ".join(tokenize(sentence))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            terms = set(key.split())
+            overlap = sum(idf.get(t, 1.0) for t in terms & query_terms)
+            score = overlap + 1.0 / (chunk_rank + 1)
+            candidates.append((score, chunk_rank, position, sentence))
+
+    chosen = []
+    used = 0
+    for score, chunk_rank, position, sentence in sorted(candidates, key=lambda c: -c[0]):
+        cost = approx_tokens(sentence)
+        if used + cost > budget_tokens:
+            continue
+        chosen.append((chunk_rank, position, sentence))
+        used += cost
+
+    return "\n".join(sentence for _, _, sentence in sorted(chosen))
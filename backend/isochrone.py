@@ -0,0 +1,236 @@
+import heapq
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import osmnx as ox
+from scipy.spatial import cKDTree
+from shapely.geometry import MultiPoint, mapping
+from shapely import concave_hull
+
+# Directory holding the <region>.graphml files written by preprocess_maps.py
+MAPS_DIR = os.getenv("MAPS_DIR", "../data/maps")
+WALK_SPEED_KMH = float(os.getenv("WALK_SPEED_KMH", "4.5"))
+ISOCHRONE_CACHE_SIZE = int(os.getenv("ISOCHRONE_CACHE_SIZE", "256"))
+MAX_LOADED_REGIONS = int(os.getenv("MAX_LOADED_REGIONS", "4"))
+
+# Request limits: they bound the search (and the cached distances) to a
+# neighbourhood instead of the whole region graph
+MAX_ISOCHRONE_MINUTES = float(os.getenv("MAX_ISOCHRONE_MINUTES", "120"))
+MAX_ISOCHRONE_KM = float(os.getenv("MAX_ISOCHRONE_KM", "30"))
+MAX_SPEED_KMH = float(os.getenv("MAX_SPEED_KMH", "120"))
+MAX_BUDGETS = 6
+MAX_TARGETS = 100
+
+_REGION_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+EARTH_RADIUS_M = 6371000.0
+
+
+class RegionGraph:
+    """
+    Compact, read-only view of a region's road graph for one-to-all
+    searches: adjacency lists with edge lengths plus a KD-tree of node
+    positions for snapping. Edges are walkable in both directions.
+    """
+    def __init__(self, G):
+        self.node_ids = list(G.nodes)
+        position = {n: i for i, n in enumerate(self.node_ids)}
+
+        self.lat = np.array([G.nodes[n]["y"] for n in self.node_ids], dtype="float64")
+        self.lon = np.array([G.nodes[n]["x"] for n in self.node_ids], dtype="float64")
+
+        self.adjacency = [dict() for _ in self.node_ids]
+        for u, v, data in G.edges(data=True):
+            a, b = position[u], position[v]
+            length = float(data.get("length", 0.0))
+            for x, y in ((a, b), (b, a)):
+                if length < self.adjacency[x].get(y, math.inf):
+                    self.adjacency[x][y] = length
+        self.adjacency = [list(nbrs.items()) for nbrs in self.adjacency]
+
+        # Equirectangular projection around the region is accurate enough for snapping
+        self.cos_lat = math.cos(math.radians(float(self.lat.mean()))) if len(self.lat) else 1.0
+        self.tree = cKDTree(np.column_stack([self.lat, self.lon * self.cos_lat]))
+
+    def snap(self, lat, lon):
+        """
+        Nearest graph node and the straight-line distance to it in meters.
+        """
+        dist_deg, i = self.tree.query([lat, lon * self.cos_lat])
+        return int(i), math.radians(float(dist_deg)) * EARTH_RADIUS_M
+
+    def reachable(self, source, max_meters):
+        """
+        Bounded Dijkstra from source: network distance of every node within
+        max_meters, as {node index: meters}.
+        """
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        adjacency = self.adjacency
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist.get(u, math.inf):
+                continue
+            for v, length in adjacency[u]:
+                nd = d + length
+                if nd <= max_meters and nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return dist
+
+
+_regions = OrderedDict()
+_searches = OrderedDict()
+_lock = threading.Lock()
+_region_locks = {}
+
+
+def region_path(region: str) -> str:
+    if not _REGION_NAME.match(region):
+        raise ValueError(f"Invalid region name: {region!r}")
+    return os.path.join(MAPS_DIR, f"{region}.graphml")
+
+
+def get_region(region: str) -> RegionGraph:
+    path = region_path(region)
+    with _lock:
+        if region in _regions:
+            _regions.move_to_end(region)
+            return _regions[region]
+        region_lock = _region_locks.setdefault(region, threading.Lock())
+
+    # Concurrent first requests for a region wait for a single load
+    with region_lock:
+        with _lock:
+            if region in _regions:
+                _regions.move_to_end(region)
+                return _regions[region]
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No preprocessed graph for region '{region}'")
+
+        print(f"⏳ Loading road graph for {region} ...")
+        graph = RegionGraph(ox.load_graphml(path))
+
+        with _lock:
+            _regions[region] = graph
+            while len(_regions) > MAX_LOADED_REGIONS:
+                _regions.popitem(last=False)
+        return graph
+
+
+def _search(region, graph, source, max_meters):
+    """
+    Distances from a snapped origin, cached per (region, node). A cached
+    search is reused for any budget up to the one it was computed for.
+    """
+    key = (region, source)
+    with _lock:
+        cached = _searches.get(key)
+        if cached and cached[0] >= max_meters:
+            _searches.move_to_end(key)
+            return cached[1]
+
+    dist = graph.reachable(source, max_meters)
+
+    with _lock:
+        _searches[key] = (max_meters, dist)
+        while len(_searches) > ISOCHRONE_CACHE_SIZE:
+            _searches.popitem(last=False)
+    return dist
+
+
+def _polygon(graph, nodes):
+    if len(nodes) < 3:
+        return None
+    points = MultiPoint([(graph.lon[i], graph.lat[i]) for i in nodes])
+    return mapping(concave_hull(points, ratio=0.3))
+
+
+def _check_point(point, name):
+    if (not isinstance(point, (list, tuple)) or len(point) != 2
+            or not all(isinstance(v, (int, float)) and math.isfinite(v) for v in point)):
+        raise ValueError(f"{name} must be a [lat, lon] pair")
+    lat, lon = point
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"{name} is not a valid [lat, lon]: {list(point)}")
+
+
+def validate_request(lat, lon, minutes, speed_kmh, targets):
+    """
+    Reject requests whose search would not stay within the limits above.
+    """
+    _check_point((lat, lon), "origin")
+    if not 0 < speed_kmh <= MAX_SPEED_KMH:
+        raise ValueError(f"speed_kmh must be in (0, {MAX_SPEED_KMH:g}]")
+    budgets = sorted({float(m) for m in minutes if m > 0})
+    if not budgets:
+        raise ValueError("At least one positive time budget is required")
+    if len(budgets) > MAX_BUDGETS:
+        raise ValueError(f"At most {MAX_BUDGETS} time budgets are allowed")
+    if budgets[-1] > MAX_ISOCHRONE_MINUTES:
+        raise ValueError(f"Time budgets may be at most {MAX_ISOCHRONE_MINUTES:g} minutes")
+    if budgets[-1] / 60 * speed_kmh > MAX_ISOCHRONE_KM:
+        raise ValueError(f"Largest budget at this speed exceeds {MAX_ISOCHRONE_KM:g} km")
+    targets = targets or []
+    if len(targets) > MAX_TARGETS:
+        raise ValueError(f"At most {MAX_TARGETS} targets are allowed")
+    for i, target in enumerate(targets):
+        _check_point(target, f"targets[{i}]")
+    return budgets
+
+
+def compute_isochrones(region, lat, lon, minutes, speed_kmh=WALK_SPEED_KMH,
+                       targets=None, include_nodes=False):
+    """
+    Reachable area from (lat, lon) for several time budgets in one search.
+    Optional targets (e.g. shelters, as [lat, lon]) get their travel time
+    or None when they are out of reach of the largest budget.
+    """
+    budgets = validate_request(lat, lon, minutes, speed_kmh, targets)
+    graph = get_region(region)
+    speed_mps = speed_kmh * 1000 / 3600
+
+    source, snap_m = graph.snap(lat, lon)
+
+    # Walking from the clicked point to the graph uses part of the budget
+    max_meters = max(0.0, budgets[-1] * 60 * speed_mps - snap_m)
+    dist = _search(region, graph, source, max_meters)
+
+    isochrones = []
+    for budget in budgets:
+        limit = budget * 60 * speed_mps - snap_m
+        nodes = [i for i, d in dist.items() if d <= limit]
+        entry = {
+            "minutes": budget,
+            "reachable_nodes": len(nodes),
+            "polygon": _polygon(graph, nodes),
+        }
+        if include_nodes:
+            entry["nodes"] = [[float(graph.lat[i]), float(graph.lon[i])] for i in nodes]
+        isochrones.append(entry)
+
+    reached = []
+    for target in targets or []:
+        node, target_snap_m = graph.snap(target[0], target[1])
+        meters = dist.get(node)
+        total = None if meters is None else (snap_m + meters + target_snap_m) / speed_mps / 60
+        reached.append({
+            "lat": target[0],
+            "lon": target[1],
+            "minutes": round(total, 1) if total is not None and total <= budgets[-1] else None,
+        })
+
+    return {
+        "region": region,
+        "origin": {
+            "lat": float(graph.lat[source]),
+            "lon": float(graph.lon[source]),
+            "snap_distance_m": round(snap_m, 1),
+        },
+        "speed_kmh": speed_kmh,
+        "isochrones": isochrones,
+        "targets": reached,
+    }
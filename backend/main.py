@@ -1,12 +1,18 @@
-from fastapi import FastAPI, UploadFile, HTTPException
+from fastapi import FastAPI, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
-from rag_pipeline import ask_first_aid, explain_rationing 
+from rag_pipeline import ask_first_aid, banked_answer, explain_rationing 
 from ration_service import ration_all
 from misinformation import check_flyer
 from map_routes import router as map_router
+from tile_routes import router as tile_router
 from safety_filter import safety_check
+from utils.translation_service import LANG_MAP, preload_models
+from scheduler import Scheduler, Overloaded
+from isochrone import compute_isochrones, validate_request, WALK_SPEED_KMH
+import metrics
 from concurrent.futures import ThreadPoolExecutor
 import subprocess
 import httpx
@@ -16,12 +22,39 @@ import time
 import osmnx as ox
 import networkx as nx
 
-executor = ThreadPoolExecutor(max_workers=4)
+# At least 3, so the capped lanes below always leave first aid a worker
+EXECUTOR_WORKERS = max(3, int(os.getenv("EXECUTOR_WORKERS", "4")))
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS)
+# Map searches are short and CPU-bound; they get their own pool so they
+# are never stuck behind LLM calls that hold a worker for minutes
+ROUTING_WORKERS = int(os.getenv("ROUTING_WORKERS", str(min(4, os.cpu_count() or 1))))
+routing_executor = ThreadPoolExecutor(max_workers=ROUTING_WORKERS, thread_name_prefix="routing")
+# Answer bank checks (one embedding, no LLM) must not wait behind LLM calls
+bank_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="answer-bank")
 GRAPH_HOPPER_KEY = os.getenv("GRAPHHOPPER_API_KEY","243a6d5e-4ffc-4d00-9cfb-12c9bb89caeb")
 
-async def run_in_thread(fn, *args, **kwargs):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(executor, lambda: fn(*args, **kwargs))
+# Lower priority value is served first. First aid may use the whole pool,
+# the other lanes are capped (together below EXECUTOR_WORKERS) so they can
+# never starve it.
+scheduler = Scheduler(executor, capacity=EXECUTOR_WORKERS)
+scheduler.add_lane("first_aid", priority=0, max_concurrency=EXECUTOR_WORKERS,
+                   max_queue=32, queue_timeout=60, deadline=600)
+scheduler.add_lane("rationing", priority=1, max_concurrency=max(1, EXECUTOR_WORKERS // 2),
+                   max_queue=16, queue_timeout=30, deadline=600)
+scheduler.add_lane("misinformation", priority=2, max_concurrency=1,
+                   max_queue=8, queue_timeout=20, deadline=180)
+
+routing_scheduler = Scheduler(routing_executor, capacity=ROUTING_WORKERS)
+routing_scheduler.add_lane("routing", priority=0, max_concurrency=ROUTING_WORKERS,
+                           max_queue=32, queue_timeout=10, deadline=30)
+
+def collect_scheduler_metrics():
+    for sched in (scheduler, routing_scheduler):
+        for name, lane in sched.stats()["lanes"].items():
+            metrics.QUEUE_DEPTH.set(lane["queued"], lane=name)
+            metrics.ACTIVE_REQUESTS.set(lane["active"], lane=name)
+
+metrics.register_collector(collect_scheduler_metrics)
 
 class LoginData(BaseModel):
     username: str
@@ -46,6 +79,15 @@ class SafeRouteRequest(BaseModel):
     end_lat: float
     end_lon: float
 
+class IsochroneRequest(BaseModel):
+    region: str
+    lat: float
+    lon: float
+    minutes: list[float] = [10, 20, 30]
+    speed_kmh: float = WALK_SPEED_KMH
+    targets: list[tuple[float, float]] = []
+    include_nodes: bool = False
+
 MODEL_NAME = os.getenv("OLLAMA_MODEL", "gpt-oss:20b")
 app = FastAPI(title="FirstResponse AI Backend")
 
@@ -58,6 +100,31 @@ app.add_middleware(
 )
 
 app.include_router(map_router)
+app.include_router(tile_router)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        with metrics.span("request", method=request.method, path=request.url.path):
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - start, endpoint=endpoint, method=request.method, status=status
+        )
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server is busy, please retry shortly.", "lane": exc.lane, "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 def warmup_model():
     try:
@@ -88,9 +155,18 @@ def root():
 def health():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/scheduler")
+def scheduler_stats():
+    return {"llm": scheduler.stats(), "routing": routing_scheduler.stats()}
+
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(run_in_thread(warmup_model))
+    asyncio.create_task(asyncio.to_thread(warmup_model))
+    preload_models()
 
 #-------------------------------------------------#
 
@@ -127,10 +203,18 @@ async def first_aid(question: str, lang: str = "English"):
             "language": lang
         }
 
-    lang_map = {"English": "en", "हिन्दी": "hi", "العربية": "ar", "Español": "es"}
-    target_lang = lang_map.get(lang, "en")
+    target_lang = LANG_MAP.get(lang, "en")
 
-    result = await run_in_thread(ask_first_aid, question, target_lang)
+    # Vetted answers for the most common emergencies are served before
+    # admission, so they stay fast when the LLM pool is full or down.
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(bank_executor, banked_answer, question, target_lang)
+    except Exception as e:
+        print(f"⚠️ Answer bank check failed: {e}")
+        result = None
+    if result is None:
+        result = await scheduler.run("first_aid", ask_first_aid, question, target_lang)
     
     return {
         "question": question,
@@ -162,15 +246,15 @@ def ration_allocation(
     return {"people": people, "days": days, "allocation": result}
 
 @app.post("/ration_all_explained")
-def ration_allocation_explained(req: RationingRequest):
+async def ration_allocation_explained(req: RationingRequest):
     resources = {
         "water_l": req.water_liters,
         "food_items": req.food_items,
         "medicine_units": req.medicines_units,
     }
     
-    explanation_text = explain_rationing(
-        resources, req.people_count, req.days_count, req.lang
+    explanation_text = await scheduler.run(
+        "rationing", explain_rationing, resources, req.people_count, req.days_count, req.lang
     )
     
     status_data = ration_all(
@@ -210,13 +294,15 @@ def ration_allocation_explained(req: RationingRequest):
 async def misinformation(file: UploadFile):
     """Scan flyer for misinformation"""
     try:
-        text, verdict_data = check_flyer(file)
+        text, verdict_data = await scheduler.run("misinformation", check_flyer, file)
 
         return {
             "extracted_text": text,
             "verdict": verdict_data["verdict"],
             "reason": verdict_data["reason"]
         }
+    except Overloaded:
+        raise
     except Exception as e:
         return {
             "extracted_text": "",
@@ -266,6 +352,20 @@ async def safe_route(req: SafeRouteRequest):
             print("Other error:", str(e))
             raise HTTPException(status_code=500, detail=str(e))
 
-
-
-
+@app.post("/isochrone")
+async def isochrone(req: IsochroneRequest):
+    """Areas reachable from a point within each time budget, on the local road graph"""
+    try:
+        # Reject oversized searches before they take a routing slot
+        validate_request(req.lat, req.lon, req.minutes, req.speed_kmh, req.targets)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        return await routing_scheduler.run(
+            "routing", compute_isochrones, req.region, req.lat, req.lon, req.minutes,
+            req.speed_kmh, req.targets, req.include_nodes
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
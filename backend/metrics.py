@@ -0,0 +1,215 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Write one JSON line per finished span here when set
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry = []
+_collectors = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total, n) in items:
+            for bound, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {c}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {n}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+def register_collector(fn):
+    """
+    Register a callable that refreshes gauges right before each scrape.
+    """
+    _collectors.append(fn)
+
+
+def render() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+    """
+    for fn in _collectors:
+        try:
+            fn()
+        except Exception as e:
+            print(f"⚠️ Metrics collector failed: {e}")
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "firstresponse_request_seconds", "End-to-end request latency.", ["endpoint", "method", "status"]
+)
+STAGE_SECONDS = Histogram(
+    "firstresponse_stage_seconds", "Latency of individual pipeline stages.", ["pipeline", "stage"]
+)
+CACHE_EVENTS = Counter(
+    "firstresponse_cache_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"]
+)
+LLM_TIMEOUTS = Counter(
+    "firstresponse_llm_timeouts_total", "Ollama calls that hit their timeout.", ["caller"]
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "firstresponse_model_load_seconds", "Time taken by the last load of each model.", ["model"]
+)
+MODEL_EVENTS = Counter(
+    "firstresponse_model_events_total", "Translation model loads and evictions.", ["model", "event"]
+)
+TRANSLATION_MODEL_BYTES = Gauge(
+    "firstresponse_translation_model_bytes", "Memory held by loaded translation models."
+)
+QUEUE_DEPTH = Gauge(
+    "firstresponse_queue_depth", "Requests waiting for a worker, per scheduler lane.", ["lane"]
+)
+ACTIVE_REQUESTS = Gauge(
+    "firstresponse_active_requests", "Requests running on a worker, per scheduler lane.", ["lane"]
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "firstresponse_queue_wait_seconds", "Time spent waiting for a worker, per scheduler lane.", ["lane"]
+)
+
+
+# --- Tracing ---
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+_span_id = contextvars.ContextVar("span_id", default=None)
+_trace_lock = threading.Lock()
+
+
+def _export(span: dict):
+    if not TRACE_FILE:
+        return
+    line = json.dumps(span, ensure_ascii=False)
+    with _trace_lock:
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a block as a child span of the current trace. Spans are only
+    exported when TRACE_FILE is set; a new trace starts if none is active.
+    """
+    trace_id = _trace_id.get() or uuid.uuid4().hex
+    parent_id = _span_id.get()
+    span_id = uuid.uuid4().hex[:16]
+    trace_token = _trace_id.set(trace_id)
+    span_token = _span_id.set(span_id)
+
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        _span_id.reset(span_token)
+        _trace_id.reset(trace_token)
+        _export({
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start": start_wall,
+            "duration_ms": round(duration * 1000, 3),
+            "attributes": attrs,
+        })
+
+
+@contextmanager
+def stage(name: str, pipeline: str):
+    """
+    Record a stage of a pipeline (first_aid, rationing, ...) in the stage
+    histogram and as a trace span.
+    """
+    start = time.perf_counter()
+    try:
+        with span(name, pipeline=pipeline):
+            yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, pipeline=pipeline, stage=name)
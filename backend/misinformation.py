@@ -2,6 +2,8 @@ import pytesseract
 from PIL import Image
 import subprocess
 import os
+from scheduler import remaining_budget
+from metrics import stage, LLM_TIMEOUTS
 
 MODEL_NAME = os.getenv("OLLAMA_MODEL", "gpt-oss:20b")
 
@@ -16,12 +18,13 @@ def query_ollama(prompt: str) -> str:
             text=True,
             encoding="utf-8",
             errors="replace",
-            timeout=120
+            timeout=remaining_budget(120)
         )
         if result.returncode != 0:
             return f"⚠ Ollama error: {result.stderr.strip()}"
         return (result.stdout or "").strip()
     except subprocess.TimeoutExpired:
+        LLM_TIMEOUTS.inc(caller="misinformation")
         return "⚠ Model timed out."
     except Exception as e:
         return f"⚠ Ollama exception: {str(e)}"
@@ -58,8 +61,9 @@ def clean_verdict(answer: str) -> dict:
 
 def check_flyer(file):
     """Extract text from flyer image and classify it as Verified / Suspicious"""
-    img = Image.open(file.file)
-    text = pytesseract.image_to_string(img, lang=OCR_LANGS)
+    with stage("ocr", "misinformation"):
+        img = Image.open(file.file)
+        text = pytesseract.image_to_string(img, lang=OCR_LANGS)
 
     markers = ["Red Cross", "WHO", "UN", "Government", "Ministry", "Official", "☎", "http", ".gov", "logo"]
     has_marker = any(m.lower() in text.lower() for m in markers)
@@ -82,7 +86,8 @@ Verdict: Verified / Suspicious
 Reason: <one short line>
 """
 
-    raw_answer = query_ollama(prompt)
+    with stage("llm", "misinformation"):
+        raw_answer = query_ollama(prompt)
     result = clean_verdict(raw_answer)
 
     if has_marker and result["verdict"].lower().startswith("suspicious"):
@@ -0,0 +1,170 @@
+import json
+import os
+import socket
+import struct
+import threading
+import uuid
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+from scheduler import remaining_budget
+
+# Messages are a 4-byte big-endian length followed by UTF-8 JSON
+HEADER = struct.Struct("!I")
+# Longest a call may wait for the model server, capped by the request budget
+MODEL_SERVER_TIMEOUT = float(os.getenv("MODEL_SERVER_TIMEOUT", "30"))
+
+
+def encode_message(payload: dict) -> bytes:
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(len(data)) + data
+
+
+def send_message(sock, payload: dict):
+    sock.sendall(encode_message(payload))
+
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("model server closed the connection")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_message(sock) -> dict:
+    (length,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return json.loads(_recv_exact(sock, length))
+
+
+def write_shared_array(array: np.ndarray, transfer: bool = False):
+    """
+    Put an array into a new shared memory block. Returns the reference to
+    send and the open block. With transfer, the receiver becomes the owner
+    and unlinks the block; otherwise the writer unlinks it when done.
+    """
+    array = np.ascontiguousarray(array, dtype="float32")
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes),
+                                     name=f"fr_{uuid.uuid4().hex[:16]}")
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    ref = {"shm": shm.name, "shape": list(array.shape), "dtype": "float32"}
+    if transfer:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return ref, shm
+
+
+def read_shared_array(ref: dict, unlink: bool = True) -> np.ndarray:
+    """
+    Copy an array out of a shared memory block, and free the block unless
+    the writer keeps ownership of it.
+    """
+    shm = shared_memory.SharedMemory(name=ref["shm"])
+    try:
+        # No named view may outlive the block, or close() fails
+        return np.ndarray(tuple(ref["shape"]), dtype=ref["dtype"], buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+        else:
+            # Attaching registered it; the writer is the one to clean it up
+            resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def unlink_shared(name: str):
+    """
+    Free a shared memory block if it still exists.
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+class ModelClient:
+    """
+    Talks to model_server.py over a Unix socket. Every thread keeps its own
+    connection so concurrent requests from the thread pool do not interleave.
+    Calls time out after MODEL_SERVER_TIMEOUT or the request's remaining
+    budget, whichever is shorter, so a hung server cannot block a worker.
+    """
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            # The server frees any reply segment this connection never read
+            sock.close()
+
+    def call(self, payload: dict) -> dict:
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.settimeout(max(0.1, remaining_budget(MODEL_SERVER_TIMEOUT)))
+                send_message(sock, payload)
+                reply = recv_message(sock)
+                break
+            except socket.timeout:
+                # A hung server would hang the retry too
+                self._drop_connection()
+                raise TimeoutError("model server did not answer in time")
+            except (OSError, ConnectionError):
+                # Server restarted: drop the stale connection and retry once
+                self._drop_connection()
+                if attempt:
+                    raise
+        if "error" in reply:
+            raise RuntimeError(f"model server: {reply['error']}")
+        return reply
+
+    def embed(self, texts) -> np.ndarray:
+        return read_shared_array(self.call({"op": "embed", "texts": list(texts)}))
+
+    def search(self, vectors, k: int):
+        # Query vectors go through shared memory; the k results come back as JSON
+        ref, shm = write_shared_array(vectors)
+        try:
+            reply = self.call({"op": "search", "vectors": ref, "k": int(k)})
+        finally:
+            shm.close()
+            shm.unlink()
+        return np.array(reply["distances"], dtype="float32"), np.array(reply["ids"], dtype="int64")
+
+    def translate(self, texts, src: str, dest: str):
+        return self.call({"op": "translate", "texts": list(texts), "src": src, "dest": dest})["texts"]
+
+
+class RemoteEmbedder:
+    """
+    Drop-in for SentenceTransformer.encode backed by the model server.
+    """
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def encode(self, texts, convert_to_numpy=True):
+        return self.client.embed(texts)
+
+
+class RemoteIndex:
+    """
+    Drop-in for the FAISS index search backed by the model server.
+    """
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def search(self, vectors, k):
+        return self.client.search(vectors, k)
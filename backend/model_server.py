@@ -0,0 +1,141 @@
+"""
+Local inference sidecar. One process owns the embedder, the FAISS index
+and the MarianMT translators; API workers started with
+MODEL_SERVER_SOCKET pointing at its socket use it instead of loading
+their own copies.
+
+    python model_server.py --socket /tmp/firstresponse-models.sock
+    MODEL_SERVER_SOCKET=/tmp/firstresponse-models.sock uvicorn main:app --workers 4
+
+The workers may be started first: they only connect on their first
+request, and requests fail with an error until the server is up.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import faiss
+from sentence_transformers import SentenceTransformer
+
+# This process serves the models itself, it must not proxy to a server
+DEFAULT_SOCKET = os.environ.pop("MODEL_SERVER_SOCKET", "/tmp/firstresponse-models.sock")
+
+from model_client import HEADER, encode_message, read_shared_array, unlink_shared, write_shared_array
+from utils.translation_service import translate_batch, preload_models
+
+EMBED_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+INDEX_DIR = "../data/first_aid/faiss_index"
+
+# Embedding requests that arrive within this window are encoded together
+BATCH_WINDOW = float(os.getenv("MODEL_SERVER_BATCH_WINDOW", "0.005"))
+MAX_BATCH = int(os.getenv("MODEL_SERVER_MAX_BATCH", "64"))
+
+
+class ModelServer:
+    def __init__(self):
+        start = time.perf_counter()
+        self.embedder = SentenceTransformer(EMBED_MODEL)
+        self.index = faiss.read_index(os.path.join(INDEX_DIR, "faiss.index"))
+        print(f"✅ Models loaded in {time.perf_counter() - start:.1f}s")
+        self.pending = None
+
+    async def start_batcher(self):
+        self.pending = asyncio.Queue()
+        asyncio.create_task(self._batch_embeddings())
+
+    async def _batch_embeddings(self):
+        while True:
+            batch = [await self.pending.get()]
+            deadline = asyncio.get_running_loop().time() + BATCH_WINDOW
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [t for texts, _ in batch for t in texts]
+            try:
+                vectors = await asyncio.to_thread(self.embedder.encode, texts, convert_to_numpy=True)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            offset = 0
+            for texts, fut in batch:
+                fut.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+    async def embed(self, texts):
+        fut = asyncio.get_running_loop().create_future()
+        await self.pending.put((texts, fut))
+        return await fut
+
+    async def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "embed":
+            # Ownership passes to the client, which unlinks it after reading
+            ref, shm = write_shared_array(await self.embed(request["texts"]), transfer=True)
+            shm.close()
+            return ref
+        if op == "search":
+            vectors = read_shared_array(request["vectors"], unlink=False)
+            D, I = await asyncio.to_thread(self.index.search, vectors, request["k"])
+            return {"distances": D.tolist(), "ids": I.tolist()}
+        if op == "translate":
+            texts = await asyncio.to_thread(translate_batch, request["texts"], request["src"], request["dest"])
+            return {"texts": texts}
+        if op == "ping":
+            return {"ok": True}
+        return {"error": f"unknown op {op!r}"}
+
+    async def serve_connection(self, reader, writer):
+        # A client sends its next request only after it has read (and
+        # freed) the previous reply, so a reply segment still present at
+        # that point, or when the connection closes, was never read.
+        unread = None
+        try:
+            while True:
+                (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                if unread:
+                    unlink_shared(unread)
+                    unread = None
+                request = json.loads(await reader.readexactly(length))
+                try:
+                    reply = await self.handle(request)
+                except Exception as e:
+                    reply = {"error": str(e)}
+                unread = reply.get("shm")
+                writer.write(encode_message(reply))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if unread:
+                unlink_shared(unread)
+            writer.close()
+
+
+async def main(socket_path):
+    server = ModelServer()
+    await server.start_batcher()
+    preload_models()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    unix_server = await asyncio.start_unix_server(server.serve_connection, path=socket_path)
+    os.chmod(socket_path, 0o600)
+    print(f"🚀 Model server listening on {socket_path}")
+    async with unix_server:
+        await unix_server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve embedder, index and translators over a Unix socket.")
+    parser.add_argument("--socket", type=str, default=DEFAULT_SOCKET)
+    args = parser.parse_args()
+    asyncio.run(main(args.socket))
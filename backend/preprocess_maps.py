@@ -1,55 +1,244 @@
 import os
+import sys
 import glob
+import json
+import time
+import hashlib
+import argparse
 import osmnx as ox
-import argparse 
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tiles import render_mbtiles
 
-def get_map_directory():
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MANIFEST_NAME = "graphml_manifest.json"
+
+# Highway values that are never part of the given network type
+EXCLUDED_HIGHWAYS = {
+    "walk": {
+        "abandoned", "bus_guideway", "construction", "cycleway", "motor", "motorway",
+        "motorway_link", "no", "planned", "platform", "proposed", "raceway", "razed",
+    },
+    "drive": {
+        "abandoned", "bridleway", "bus_guideway", "construction", "corridor", "cycleway",
+        "elevator", "escalator", "footway", "no", "path", "pedestrian", "planned",
+        "platform", "proposed", "raceway", "razed", "steps", "track",
+    },
+}
+
+# pyrosm's names for the same network types
+PYROSM_NETWORK = {"walk": "walking", "drive": "driving", "all": "all"}
+
+def get_args():
     parser = argparse.ArgumentParser(description="Pre-process OSM/PBF maps into GraphML format.")
     parser.add_argument("maps_dir", type=str, help="The full path to the directory containing your map files.")
+    parser.add_argument("--network-type", choices=["walk", "drive", "all"], default="walk",
+                        help="Keep only ways usable for this mode of travel.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Regions processed in parallel.")
+    parser.add_argument("--force", action="store_true", help="Rebuild regions even if unchanged.")
+    parser.add_argument("--tiles", action="store_true",
+                        help="Also render offline map tiles (.mbtiles). Each extra zoom level "
+                             "takes about four times as long as the one before.")
+    parser.add_argument("--min-zoom", type=int, default=10, help="Lowest zoom level of the offline map tiles.")
+    parser.add_argument("--max-zoom", type=int, default=15, help="Highest zoom level of the offline map tiles.")
     args = parser.parse_args()
-    return os.path.abspath(args.maps_dir)
+    args.maps_dir = os.path.abspath(args.maps_dir)
+    if not 0 <= args.min_zoom <= args.max_zoom <= 22:
+        parser.error("zoom levels must satisfy 0 <= --min-zoom <= --max-zoom <= 22")
+    return args
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return round(peak / 2**20 if sys.platform == "darwin" else peak / 1024, 1)
+
+def filter_network(G, network_type):
+    """
+    Drop ways that the network type cannot use, then nodes left without edges.
+    """
+    excluded = EXCLUDED_HIGHWAYS.get(network_type)
+    if not excluded:
+        return G
+
+    def usable(data):
+        highway = data.get("highway")
+        values = highway if isinstance(highway, list) else [highway]
+        if not any(values) or all(v in excluded for v in values):
+            return False
+        if network_type == "walk" and data.get("foot") == "no":
+            return False
+        if network_type == "drive" and "no" in (data.get("motor_vehicle"), data.get("motorcar")):
+            return False
+        return True
+
+    drop = [(u, v, k) for u, v, k, data in G.edges(keys=True, data=True) if not usable(data)]
+    G.remove_edges_from(drop)
+    G.remove_nodes_from([n for n in list(G.nodes) if G.degree(n) == 0])
+    return G
 
-def create_graphml_files(maps_directory):
+def load_network(map_path, network_type):
+    if map_path.endswith(".pbf"):
+        # pyrosm filters by network type while parsing, so unused ways are never built
+        from pyrosm import OSM
+        osm = OSM(map_path)
+        nodes, edges = osm.get_network(network_type=PYROSM_NETWORK[network_type], nodes=True)
+        G = osm.to_graph(nodes, edges, graph_type="networkx",
+                         force_bidirectional=(network_type == "walk"))
+    else:
+        # Pedestrians may walk one-way streets in both directions
+        G = ox.graph_from_xml(map_path, bidirectional=(network_type == "walk"),
+                              simplify=False, retain_all=False)
+        G = filter_network(G, network_type)
+    return ox.simplify_graph(G)
+
+def build_region(map_path, graphml_file, network_type, tile_zooms=None):
+    """
+    Build and save one region's graph, and its map tiles when tile_zooms
+    is a (min, max) zoom range. Runs in a worker process; files are
+    written under a temporary name and renamed, so readers never see a
+    partial GraphML or MBTiles file.
+    """
+    start = time.perf_counter()
+    region = os.path.basename(graphml_file)[:-len(".graphml")]
+    tmp_file = f"{graphml_file}.{os.getpid()}.tmp"
+    try:
+        G = load_network(map_path, network_type)
+        ox.save_graphml(G, tmp_file)
+        os.replace(tmp_file, graphml_file)
+        tile_count = None
+        if tile_zooms:
+            mbtiles_file = graphml_file[:-len(".graphml")] + ".mbtiles"
+            tile_count = render_mbtiles(G, mbtiles_file, region, *tile_zooms)
+        return {
+            "region": region,
+            "ok": True,
+            "nodes": G.number_of_nodes(),
+            "edges": G.number_of_edges(),
+            "tiles": tile_count,
+            "seconds": round(time.perf_counter() - start, 2),
+            "peak_memory_mb": peak_memory_mb(),
+        }
+    except Exception as e:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return {
+            "region": region,
+            "ok": False,
+            "error": str(e),
+            "seconds": round(time.perf_counter() - start, 2),
+            "peak_memory_mb": peak_memory_mb(),
+        }
+
+def load_manifest(maps_directory):
+    try:
+        with open(os.path.join(maps_directory, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(maps_directory, manifest):
+    path = os.path.join(maps_directory, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def find_map_files(maps_directory):
+    map_files = set(glob.glob(os.path.join(maps_directory, "*.osm")))
+    map_files.update(glob.glob(os.path.join(maps_directory, "*.xml")))
+    map_files.update(glob.glob(os.path.join(maps_directory, "*.pbf")))
+    return sorted(map_files)
+
+def create_graphml_files(maps_directory, network_type="walk", workers=1, force=False, tile_zooms=None):
     """
     Finds all .osm or .pbf files in the given directory and creates
-    a corresponding .graphml file for each one.
+    a corresponding .graphml file for each one, plus a .mbtiles file of
+    offline map tiles when tile_zooms is a (min, max) zoom range. Regions are built in
+    parallel and only when their source file, network type or tile zoom
+    range changed.
     """
     print(f"Searching for maps in: {maps_directory}")
-    map_files = glob.glob(os.path.join(maps_directory, "*.osm*"))
-    map_files.extend(glob.glob(os.path.join(maps_directory, "*.pbf")))
+    map_files = find_map_files(maps_directory)
 
     if not map_files:
         print("No .osm or .pbf map files found to process.")
         return
 
+    manifest = load_manifest(maps_directory)
+    jobs = {}
     for map_path in map_files:
         region = os.path.basename(map_path).split('.')[0]
         graphml_file = os.path.join(maps_directory, f"{region}.graphml")
+        source_hash = file_sha256(map_path)
 
-        if os.path.exists(graphml_file):
-            print(f"✅ GraphML for {region} already exists. Skipping.")
+        entry = manifest.get(region, {})
+        unchanged = (
+            os.path.exists(graphml_file)
+            and entry.get("source_sha256") == source_hash
+            and entry.get("network_type") == network_type
+        )
+        if tile_zooms:
+            unchanged = (
+                unchanged
+                and os.path.exists(os.path.join(maps_directory, f"{region}.mbtiles"))
+                and entry.get("tile_zooms") == list(tile_zooms)
+            )
+        if unchanged and not force:
+            print(f"✅ GraphML for {region} is up to date. Skipping.")
             continue
 
-        print(f"⏳ Processing {region} from {map_path}...")
-        try:
-            if map_path.endswith((".osm", ".xml")):
-                print(f"   -> Parsing as OSM/XML file...")
-                G = ox.graph_from_xml(map_path, simplify=True)
-            elif map_path.endswith(".pbf"):
-                print(f"   -> Parsing as PBF file...")
-                G = ox.graph_from_pbf(map_path, simplify=True)
-            else:
-                print(f"   -> Skipping unsupported file type: {map_path}")
+        jobs[region] = (map_path, graphml_file, source_hash)
+
+    if not jobs:
+        return
+
+    print(f"⏳ Building {len(jobs)} region(s) with {min(workers, len(jobs))} worker(s)...")
+    # One task per process so the reported peak memory belongs to that region
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), max_tasks_per_child=1) as pool:
+        futures = {
+            pool.submit(build_region, map_path, graphml_file, network_type, tile_zooms): region
+            for region, (map_path, graphml_file, _) in jobs.items()
+        }
+        for future in as_completed(futures):
+            region = futures[future]
+            result = future.result()
+            if not result["ok"]:
+                print(f"❌ Failed to process {region}: {result['error']}")
                 continue
 
-            ox.save_graphml(G, graphml_file)
-            print(f"👍 Saved GraphML for {region} at {graphml_file}")
-        except Exception as e:
-            print(f"❌ Failed to process {region}: {e}")
+            tiles = f", {result['tiles']} tiles" if result["tiles"] is not None else ""
+            print(f"👍 {region}: {result['nodes']} nodes, {result['edges']} edges{tiles} in "
+                  f"{result['seconds']}s (peak {result['peak_memory_mb']} MB)")
+            manifest[region] = {
+                "source": os.path.basename(jobs[region][0]),
+                "source_sha256": jobs[region][2],
+                "network_type": network_type,
+                "nodes": result["nodes"],
+                "edges": result["edges"],
+                "tile_zooms": list(tile_zooms) if tile_zooms else None,
+                "tiles": result["tiles"],
+                "seconds": result["seconds"],
+                "peak_memory_mb": result["peak_memory_mb"],
+            }
+            save_manifest(maps_directory, manifest)
 
 if __name__ == "__main__":
-    MAPS_DIR = get_map_directory()
-    
+    args = get_args()
+
     print("--- Starting Map Pre-processing ---")
-    create_graphml_files(MAPS_DIR)
-    print("--- Pre-processing Complete ---")
\ No newline at end of file
+    tile_zooms = (args.min_zoom, args.max_zoom) if args.tiles else None
+    create_graphml_files(args.maps_dir, args.network_type, args.workers, args.force, tile_zooms)
+    print("--- Pre-processing Complete ---")
@@ -1,27 +1,115 @@
 import re
+import codecs
 import faiss
 import numpy as np
 import subprocess
 import os
+import tempfile
+import threading
+import time
 from sentence_transformers import SentenceTransformer
-from utils.translation_service import translate_text
+from utils.translation_service import translate_text, translate_batch
 from ration_service import ration_all
-
-embedder = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
+from safety_filter import BLOCKED_MESSAGE
+import semantic_safety
+import answer_bank
+from hybrid_retrieval import BM25, fuse, pack_context
+from structured_output import IncrementalAnswerParser, JSON_INSTRUCTIONS
+from scheduler import remaining_budget
+from metrics import stage, LLM_TIMEOUTS, MODEL_LOAD_SECONDS
+from model_client import ModelClient, RemoteEmbedder, RemoteIndex
+
+EMBED_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+# When set, the embedder and index live in model_server.py behind this socket
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "")
+
+if MODEL_SERVER_SOCKET:
+    model_client = ModelClient(MODEL_SERVER_SOCKET)
+    embedder = RemoteEmbedder(model_client)
+else:
+    _load_start = time.perf_counter()
+    embedder = SentenceTransformer(EMBED_MODEL)
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - _load_start, model=EMBED_MODEL)
 
 MODEL_NAME = os.getenv("OLLAMA_MODEL", "gpt-oss:20b")
+# "translate": translate the question to English first. "direct": embed
+# it in its own language (the embedder is multilingual) and skip the
+# seq2seq pass; the chunks are English, so BM25 and lexical packing then
+# only help English questions. Compare with benchmarks/eval_retrieval.py
+# before switching.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "translate")
 MAIN_TIMEOUT = 600
+# Ask the model for JSON (steps + checklist) instead of free text
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "1") == "1"
+
+# Candidates taken from each retriever before fusion, and the prompt
+# budget for the packed context (~600 characters before).
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "8"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "200"))
 
 INDEX_DIR = "../data/first_aid/faiss_index"
-index = faiss.read_index(os.path.join(INDEX_DIR, "faiss.index"))
+_load_start = time.perf_counter()
+if MODEL_SERVER_SOCKET:
+    index = RemoteIndex(model_client)
+else:
+    index = faiss.read_index(os.path.join(INDEX_DIR, "faiss.index"))
+# Chunk texts stay in every worker: BM25 and context packing need them
 docs = np.load(os.path.join(INDEX_DIR, "docs.npy"), allow_pickle=True)
+MODEL_LOAD_SECONDS.set(time.perf_counter() - _load_start, model="faiss_index")
+
+bm25 = BM25(docs)
+
+_exemplars_lock = threading.Lock()
+_exemplars_loaded = False
+
+def load_exemplars():
+    """
+    Embed the semantic safety exemplars and the answer bank questions on
+    first use instead of at import, so API workers can start before
+    model_server.py is listening. If the embedder is unreachable this
+    raises and the next request tries again.
+    """
+    global _exemplars_loaded
+    if _exemplars_loaded:
+        return
+    with _exemplars_lock:
+        if not _exemplars_loaded:
+            semantic_safety.load_exemplars(embedder)
+            answer_bank.load_question_embeddings(embedder)
+            _exemplars_loaded = True
 
 # --- Retrieval ---
-def retrieve(query, k=3):
-    q_embed = embedder.encode([query], convert_to_numpy=True)
+def embed_query(query):
+    return embedder.encode([query], convert_to_numpy=True)
+
+def search(q_embed, k=3):
     D, I = index.search(q_embed, k)
     return [docs[i] for i in I[0]]
 
+def retrieve(query, k=3):
+    return search(embed_query(query), k)
+
+def hybrid_search(query, q_embed, k=HYBRID_CANDIDATES):
+    """
+    Fuse the dense FAISS ranking with the BM25 keyword ranking.
+    Returns chunk texts, best first.
+    """
+    _, I = index.search(q_embed, k)
+    dense = [int(i) for i in I[0] if i >= 0]
+    keyword = bm25.top(query, k)
+    return [docs[doc_id] for doc_id, _ in fuse([dense, keyword])[:k]]
+
+def prepare_query(question, src_lang="en", mode=None):
+    """
+    Text used both for retrieval and in the prompt. Direct mode skips the
+    seq2seq pass: the embedder and the LLM both read the original language.
+    """
+    mode = mode or RETRIEVAL_MODE
+    if mode == "translate" and src_lang != "en":
+        with stage("translate_in", "first_aid"):
+            return translate_text(question, src=src_lang, dest="en")
+    return question
+
 # --- Run Ollama ---
 def query_ollama(prompt, model=MODEL_NAME):
     try:
@@ -32,7 +120,7 @@ def query_ollama(prompt, model=MODEL_NAME):
             text=True,
             encoding="utf-8",
             errors="replace",
-            timeout=MAIN_TIMEOUT
+            timeout=remaining_budget(MAIN_TIMEOUT)
         )
 
         if result.returncode != 0:
@@ -43,34 +131,106 @@ def query_ollama(prompt, model=MODEL_NAME):
         return output or "⚠ No output from model."
 
     except subprocess.TimeoutExpired:
+        LLM_TIMEOUTS.inc(caller="rag_pipeline")
         return None
     except Exception as e:
         return f"⚠ Ollama exception: {e}"
 
+def stream_ollama(prompt, model=MODEL_NAME, fmt=None, status=None):
+    """
+    Yield the model output piece by piece while it is generated.
+    The process is killed when the request's time budget runs out;
+    status, if given, gets "timed_out", "returncode" and "stderr" set
+    once the stream ends.
+    """
+    cmd = ["ollama", "run", model]
+    if fmt:
+        cmd += ["--format", fmt]
+
+    # stderr goes to a file, a pipe nobody reads could fill up and block ollama
+    stderr = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(remaining_budget(MAIN_TIMEOUT), kill)
+    timer.start()
+    try:
+        proc.stdin.write(prompt.encode("utf-8"))
+        proc.stdin.close()
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            data = proc.stdout.read1(4096)
+            if not data:
+                break
+            yield decoder.decode(data)
+        yield decoder.decode(b"", final=True)
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        if status is not None:
+            stderr.seek(0)
+            status["timed_out"] = timed_out.is_set()
+            status["returncode"] = proc.returncode
+            status["stderr"] = stderr.read().decode("utf-8", errors="replace").strip()
+        stderr.close()
+        if timed_out.is_set():
+            LLM_TIMEOUTS.inc(caller="rag_pipeline")
+
+def query_structured(prompt, on_event=None):
+    """
+    Request a JSON answer and parse it as it streams in. on_event, if
+    given, receives each ("step", text) / ("row", dict) as soon as it is
+    complete. Returns the raw output and the parsed steps and checklist,
+    with "complete" False when generation timed out or stopped before the
+    JSON was closed (the steps are then only a prefix of the answer), and
+    "error" set when Ollama failed.
+    """
+    parser = IncrementalAnswerParser()
+    chunks = []
+    status = {}
+    try:
+        for chunk in stream_ollama(prompt, fmt="json", status=status):
+            chunks.append(chunk)
+            for event in parser.feed(chunk):
+                if on_event:
+                    on_event(event)
+    except Exception as e:
+        print(f"⚠ Ollama stream error: {e}")
+        status["error"] = f"⚠ Ollama exception: {e}"
+    parsed = parser.result()
+    parsed["complete"] = parser.complete and not status.get("timed_out", False)
+    parsed["error"] = status.get("error")
+    if not status.get("timed_out") and status.get("returncode"):
+        parsed["error"] = f"⚠ Ollama returned non-zero exit code: {status.get('stderr', '')}"
+    return "".join(chunks), parsed
+
 # --- Clean answers ---
+_FIRST_STEP = re.compile(r"(\n|^)\s*1[\.\)-]")
+_REASONING_LINE = re.compile(r"(?:thinking|we must|the user wants|context|done thinking|let's)", re.IGNORECASE)
+_REASONING_WORDS = ("thinking", "context", "user wants", "we must")
+
 def clean_answer(answer_text: str) -> str:
     """
     Remove reasoning sections and keep only final steps/checklist.
     """
     # Keep only from first numbered step onwards
-    match = re.search(r"(\n|^)\s*1[\.\)-]", answer_text)
+    match = _FIRST_STEP.search(answer_text)
     if match:
         answer_text = answer_text[match.start():]
 
-    bad_patterns = [
-        r"(?i)thinking.*",
-        r"(?i)we must.*",
-        r"(?i)the user wants.*",
-        r"(?i)context.*",
-        r"(?i)done thinking.*",
-        r"(?i)let's.*"
-    ]
-
     lines = []
     for line in answer_text.splitlines():
-        if any(re.match(pat, line.strip()) for pat in bad_patterns):
+        line = line.strip()
+        if _REASONING_LINE.match(line):
             continue
-        lines.append(line.strip())
+        lines.append(line)
 
     return "\n".join([l for l in lines if l])
 
@@ -82,65 +242,128 @@ def enforce_steps_only(answer_text: str) -> str:
     parts = cleaned.split("\n")
     final = []
     for line in parts:
-        if any(x in line.lower() for x in ["thinking", "context", "user wants", "we must"]):
+        lower = line.lower()
+        if any(x in lower for x in _REASONING_WORDS):
             continue
         final.append(line)
     return "\n".join(final[:20])  # cap length
 
 # --- Table formatter ---
+# Fallback checklist rows for free-text answers: (keywords, row)
+TABLE_RULES = [
+    (("stop bleeding",), {
+        "Action": "Stop bleeding",
+        "How to do it": "Apply firm pressure with clean cloth/gauze",
+        "What to avoid": "Removing shrapnel"
+    }),
+    (("clean", "wash"), {
+        "Action": "Clean wound",
+        "How to do it": "Wash skin gently, cover with gauze",
+        "What to avoid": "Ointments, antiseptic sprays, ice"
+    }),
+    (("elevate",), {
+        "Action": "Elevate limb",
+        "How to do it": "Raise limb above body",
+        "What to avoid": "None"
+    }),
+    (("monitor",), {
+        "Action": "Monitor",
+        "How to do it": "Watch for fever, swelling, pain",
+        "What to avoid": "Delaying referral"
+    }),
+    (("breath", "chest"), {
+        "Action": "Breathing/CPR",
+        "How to do it": "Mouth-to-mouth, chest compressions",
+        "What to avoid": "None"
+    }),
+]
+
 def format_as_table(answer_text: str):
-    table_data = []
-
-    if "stop bleeding" in answer_text.lower():
-        table_data.append({
-            "Action": "Stop bleeding",
-            "How to do it": "Apply firm pressure with clean cloth/gauze",
-            "What to avoid": "Removing shrapnel"
-        })
-
-    if "clean" in answer_text.lower() or "wash" in answer_text.lower():
-        table_data.append({
-            "Action": "Clean wound",
-            "How to do it": "Wash skin gently, cover with gauze",
-            "What to avoid": "Ointments, antiseptic sprays, ice"
-        })
-
-    if "elevate" in answer_text.lower():
-        table_data.append({
-            "Action": "Elevate limb",
-            "How to do it": "Raise limb above body",
-            "What to avoid": "None"
-        })
-
-    if "monitor" in answer_text.lower():
-        table_data.append({
-            "Action": "Monitor",
-            "How to do it": "Watch for fever, swelling, pain",
-            "What to avoid": "Delaying referral"
-        })
-
-    if "breath" in answer_text.lower() or "chest" in answer_text.lower():
-        table_data.append({
-            "Action": "Breathing/CPR",
-            "How to do it": "Mouth-to-mouth, chest compressions",
-            "What to avoid": "None"
-        })
-
-    return table_data
+    lower = answer_text.lower()
+    return [dict(row) for keywords, row in TABLE_RULES if any(k in lower for k in keywords)]
+
+def translate_structured(parsed, target_lang):
+    """
+    Translate steps and checklist cells in one batched MarianMT call and
+    return the numbered answer text and the checklist.
+    """
+    steps = parsed["steps"][:20]
+    rows = parsed["checklist"]
+    cells = [value for row in rows for value in row.values()]
+
+    translated = translate_batch(steps + cells, src="en", dest=target_lang)
+    steps_out = translated[:len(steps)]
+    cells_out = iter(translated[len(steps):])
+
+    table = [{key: next(cells_out) for key in row} for row in rows]
+    text = "\n".join(f"{i}. {step}" for i, step in enumerate(steps_out, start=1))
+    return text, table
 
 # --- Main pipeline ---
+NO_ANSWER_MESSAGE = "⚠ The AI could not generate an answer. Please consult Red Cross first aid basics."
+INCOMPLETE_NOTICE = ("This answer was cut off and may be missing steps. "
+                     "Please also consult Red Cross first aid basics.")
+
+def banked_answer(question, target_lang="en"):
+    """
+    Vetted pre-generated answer for one of the most common emergencies,
+    or None. Only the embedder and the safety check run, never the LLM,
+    so this is served before the request is queued for a worker.
+    """
+    # No keyword, no bank entry: skip the embedding entirely
+    if not answer_bank.match_intent(question):
+        return None
+
+    with stage("embed", "answer_bank"):
+        q_embed = embed_query(question)
+    with stage("semantic_safety", "answer_bank"):
+        load_exemplars()
+        verdict = semantic_safety.classify(q_embed)
+    if not verdict["safe"]:
+        return {
+            "text": BLOCKED_MESSAGE,
+            "table": []
+        }
+
+    banked = answer_bank.lookup(question, target_lang, q_embed)
+    if not banked:
+        return None
+    return {
+        "text": banked["text"],
+        "table": banked["table"]
+    }
+
 def ask_first_aid(question, target_lang="en"):
     try:
-        q_en = translate_text(question, src=target_lang, dest="en")
+        query = prepare_query(question, target_lang)
+
+        with stage("embed", "first_aid"):
+            q_embed = embed_query(query)
 
-        context_docs = retrieve(q_en, k=1)
-        if not context_docs or all(d.strip() == "" for d in context_docs):
+        # Second-stage safety check on the same vector used for retrieval,
+        # so paraphrased unsafe queries never reach the LLM.
+        with stage("semantic_safety", "first_aid"):
+            load_exemplars()
+            verdict = semantic_safety.classify(q_embed)
+        if not verdict["safe"]:
+            return {
+                "text": BLOCKED_MESSAGE,
+                "table": []
+            }
+
+        with stage("retrieve", "first_aid"):
+            context_docs = hybrid_search(query, q_embed)
+            context = pack_context(query, context_docs, CONTEXT_TOKEN_BUDGET, bm25.idf)
+        if not context.strip():
             return {
                 "text": "⚠ No relevant info found in manuals. Please consult emergency guides.",
                 "table": []
             }
 
-        context = context_docs[0][:600]
+        if STRUCTURED_OUTPUT:
+            answer_format = "Answer in English.\n" + JSON_INSTRUCTIONS
+        else:
+            answer_format = "Answer in English, in simple numbered steps:"
 
         prompt = f"""
 You are a humanitarian survival assistant.
@@ -154,24 +377,73 @@ Use ONLY the following context from WHO/Red Cross manuals to answer.
 Context:
 {context}
 
-User's question: {q_en}
+User's question: {query}
 
-Answer in {target_lang}, in simple numbered steps:
+{answer_format}
 """
-        answer_en = query_ollama(prompt)
-        answer_en = enforce_steps_only(answer_en)
+        parsed = None
+        with stage("llm", "first_aid"):
+            if STRUCTURED_OUTPUT:
+                raw_answer, parsed = query_structured(prompt)
+            else:
+                raw_answer = query_ollama(prompt)
+
+        if parsed and parsed["error"]:
+            return {
+                "text": parsed["error"],
+                "table": []
+            }
+
+        if parsed and not parsed["complete"]:
+            # Cut off mid-answer: never pass a prefix off as the full instructions
+            if not parsed["steps"]:
+                return {
+                    "text": NO_ANSWER_MESSAGE,
+                    "table": []
+                }
+            with stage("translate_out", "first_aid"):
+                answer_final, table = translate_structured(parsed, target_lang)
+                notice = translate_text(INCOMPLETE_NOTICE, src="en", dest=target_lang)
+            return {
+                "text": f"{answer_final}\n\n⚠ {notice}",
+                "table": table,
+                "incomplete": True
+            }
+
+        if parsed:
+            # A complete JSON object without steps is not an answer; never
+            # fall through to the free-text cleanup and serve the raw JSON
+            if not parsed["steps"]:
+                return {
+                    "text": NO_ANSWER_MESSAGE,
+                    "table": []
+                }
+            with stage("translate_out", "first_aid"):
+                answer_final, table = translate_structured(parsed, target_lang)
+            return {
+                "text": answer_final,
+                "table": table
+            }
+
+        # Free-text answer: regex cleanup
+        with stage("enforce_steps_only", "first_aid"):
+            answer_en = enforce_steps_only(raw_answer or "")
 
         if not answer_en:
             return {
-                "text": "⚠ The AI could not generate an answer. Please consult Red Cross first aid basics.",
+                "text": NO_ANSWER_MESSAGE,
                 "table": []
             }
 
-        answer_final = translate_text(answer_en, src="en", dest=target_lang)
+        with stage("translate_out", "first_aid"):
+            answer_final = translate_text(answer_en, src="en", dest=target_lang)
+
+        with stage("format_as_table", "first_aid"):
+            table = format_as_table(answer_final)
 
         return {
             "text": answer_final,
-            "table": format_as_table(answer_final)
+            "table": table
         }
 
     except Exception as e:
@@ -208,7 +480,8 @@ The following resources are available for {people} people over {days} days:
 Answer in {target_lang}.
 """
 
-    answer = query_ollama(prompt)
+    with stage("llm", "rationing"):
+        answer = query_ollama(prompt)
     return clean_answer(answer)
 
 
@@ -1,4 +1,7 @@
+import os
 import re
+import threading
+import unicodedata
 
 #Blocked categories
 BLOCKED_KEYWORDS = [
@@ -11,18 +14,136 @@ BLOCKED_KEYWORDS = [
     "poison", "toxic", "cyanide", "anthrax", "chemical weapon", "nerve gas",
 
     # Hacking / malware
-    "ddos", "virus", "malware", "hack database", "backdoor", "keylogger"
+    "ddos", "virus", "malware", "hack database", "backdoor", "keylogger",
+
+    # Hindi, Arabic and Spanish. Words that also have a harmless meaning
+    # (Arabic "سم" is the centimetre abbreviation, "veneno"/"जहर" also mean
+    # snake venom) are only listed as phrases about harming someone.
+    # Hindi
+    "बम", "विस्फोटक", "बंदूक", "पिस्तौल", "ग्रेनेड", "हत्या", "जहर देना", "ज़हर देना",
+    "जहर दे दो", "ज़हर दे दो", "मार डालो", "रासायनिक हथियार",
+
+    # Arabic
+    "قنبلة", "القنبلة", "متفجرات", "المتفجرات", "مسدس", "بندقية", "قنبلة يدوية",
+    "قتل", "اغتيال", "تسميم شخص", "اسمم", "سيانيد", "سلاح كيميائي", "غاز الأعصاب",
+
+    # Spanish
+    "bomba", "explosivo", "explosivos", "pistola", "rifle", "granada", "misil",
+    "matar", "asesinar", "asesinato", "envenenar", "cianuro", "ántrax",
+    "arma química", "gas nervioso",
 ]
 
+# Optional extra rules, one term per line ("#" starts a comment).
+# The file is re-read whenever its modification time changes.
+SAFETY_RULES_FILE = os.getenv("SAFETY_RULES_FILE", "")
+
+BLOCKED_MESSAGE = "⚠️ This query is blocked for safety reasons. Please ask only survival, health, or aid-related questions."
+
+# Arabic harakat, tatweel and superscript alef
+_ARABIC_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_ARABIC_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه"})
+_SPACES = re.compile(r"\s+")
+
+# Devanagari vowel signs are not \w for Python's re, so they are listed
+# explicitly to keep "बम" from matching inside "बमबारी"-style compounds.
+_WORD_CHARS = r"\w\u0900-\u097f"
+
+_lock = threading.Lock()
+_matcher = None
+_rules_mtime = None
+
+
+def normalize(text: str) -> str:
+    """
+    Fold case, accents and script variants so that "Ántrax", "antrax"
+    and Arabic text with or without diacritics compare equal.
+    """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(
+        ch for ch in text
+        if not "\u0300" <= ch <= "\u036f"
+    )
+    text = _ARABIC_MARKS.sub("", text).translate(_ARABIC_LETTERS)
+    text = unicodedata.normalize("NFC", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def _trie_pattern(terms) -> str:
+    """
+    Build a regex from a character trie of the terms so that the engine
+    walks shared prefixes once instead of trying every alternative.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def walk(node):
+        end = "" in node
+        branches = [re.escape(ch) + walk(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not end:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if end else body
+
+    return walk(trie)
+
+
+def compile_matcher(terms):
+    """
+    Compile all blocklist terms into one pattern matched in a single pass.
+    """
+    normalized = sorted({normalize(t) for t in terms if t and normalize(t)})
+    if not normalized:
+        return None
+    return re.compile(
+        rf"(?<![{_WORD_CHARS}])(?:{_trie_pattern(normalized)})(?![{_WORD_CHARS}])"
+    )
+
+
+def load_rules_file(path: str):
+    with open(path, encoding="utf-8") as f:
+        lines = [line.split("#", 1)[0].strip() for line in f]
+    return [line for line in lines if line]
+
+
+def _current_matcher():
+    global _matcher, _rules_mtime
+
+    mtime = None
+    if SAFETY_RULES_FILE:
+        try:
+            mtime = os.stat(SAFETY_RULES_FILE).st_mtime_ns
+        except OSError:
+            mtime = None
+
+    if _matcher is not None and mtime == _rules_mtime:
+        return _matcher
+
+    with _lock:
+        if _matcher is None or mtime != _rules_mtime:
+            terms = list(BLOCKED_KEYWORDS)
+            if mtime is not None:
+                try:
+                    terms.extend(load_rules_file(SAFETY_RULES_FILE))
+                    print(f"🔄 Loaded safety rules from {SAFETY_RULES_FILE}")
+                except OSError as e:
+                    print(f"⚠️ Could not read safety rules: {e}")
+            _matcher = compile_matcher(terms)
+            _rules_mtime = mtime
+    return _matcher
+
+
 def is_safe_query(query: str) -> bool:
     """
     Returns False if the query contains unsafe keywords.
     """
-    q = query.lower()
-    for word in BLOCKED_KEYWORDS:
-        if re.search(rf"\b{re.escape(word)}\b", q):
-            return False
-    return True
+    matcher = _current_matcher()
+    return matcher is None or matcher.search(normalize(query)) is None
 
 def safety_check(query: str) -> dict:
     """
@@ -31,6 +152,6 @@ def safety_check(query: str) -> dict:
     if not is_safe_query(query):
         return {
             "safe": False,
-            "message": "⚠️ This query is blocked for safety reasons. Please ask only survival, health, or aid-related questions."
+            "message": BLOCKED_MESSAGE
         }
     return {"safe": True}
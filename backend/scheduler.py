@@ -0,0 +1,211 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import threading
+import time
+from metrics import QUEUE_WAIT_SECONDS
+
+_budget = threading.local()
+
+
+class Overloaded(Exception):
+    """
+    Raised when a lane cannot admit a request: its queue is full or the
+    request waited longer than the lane's queue timeout.
+    """
+    def __init__(self, lane: str, retry_after: int, reason: str):
+        super().__init__(f"{lane}: {reason}")
+        self.lane = lane
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Lane:
+    def __init__(self, name, priority, max_concurrency, max_queue, queue_timeout, deadline):
+        self.name = name
+        self.priority = priority
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.deadline = deadline
+
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.avg_service = 1.0
+
+    def retry_after(self) -> int:
+        """
+        Rough estimate of when a slot frees up, for the Retry-After header.
+        """
+        slots = max(1, self.max_concurrency)
+        return max(1, math.ceil(self.avg_service * (self.queued + 1) / slots))
+
+    def stats(self) -> dict:
+        return {
+            "priority": self.priority,
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_s": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+            "max_wait_s": round(self.max_wait, 4),
+            "avg_service_s": round(self.avg_service, 4),
+        }
+
+
+class Scheduler:
+    """
+    Admission control in front of the blocking thread pool.
+
+    Every lane has its own concurrency limit and bounded queue. Free pool
+    slots go to the waiting request with the best (lowest) priority whose
+    lane still has room, so first-aid queries overtake flyer scans.
+    Must be used from a single event loop.
+    """
+    def __init__(self, executor, capacity: int):
+        self.executor = executor
+        self.capacity = capacity
+        self.lanes = {}
+        self._running = 0
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def add_lane(self, name, priority=0, max_concurrency=1, max_queue=16,
+                 queue_timeout=30.0, deadline=600.0):
+        self.lanes[name] = Lane(name, priority, max_concurrency, max_queue, queue_timeout, deadline)
+
+    def _can_start(self, lane: Lane) -> bool:
+        return self._running < self.capacity and lane.active < lane.max_concurrency
+
+    def _start(self, lane: Lane):
+        self._running += 1
+        lane.active += 1
+
+    def _dispatch(self):
+        skipped = []
+        while self._waiters and self._running < self.capacity:
+            entry = heapq.heappop(self._waiters)
+            _, _, lane, fut = entry
+            if fut.done():
+                continue
+            if lane.active >= lane.max_concurrency:
+                skipped.append(entry)
+                continue
+            self._start(lane)
+            lane.queued -= 1
+            fut.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def _release(self, lane: Lane):
+        self._running -= 1
+        lane.active -= 1
+        self._dispatch()
+
+    async def _acquire(self, lane: Lane):
+        if self._can_start(lane) and not any(w[2] is lane for w in self._waiters):
+            self._start(lane)
+            return
+
+        if lane.queued >= lane.max_queue:
+            lane.rejected += 1
+            raise Overloaded(lane.name, lane.retry_after(), "queue is full")
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane.priority, next(self._seq), lane, fut))
+        lane.queued += 1
+
+        try:
+            await asyncio.wait({fut}, timeout=lane.queue_timeout)
+        except BaseException:
+            # Client went away while waiting; give back a slot if one was granted
+            if fut.done():
+                self._release(lane)
+            else:
+                fut.cancel()
+                lane.queued -= 1
+            raise
+
+        if not fut.done():
+            fut.cancel()
+            lane.queued -= 1
+            lane.timed_out += 1
+            raise Overloaded(lane.name, lane.retry_after(), "timed out waiting in queue")
+
+    async def run(self, lane_name: str, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the thread pool once the lane admits it.
+        The lane deadline, counted from arrival, is visible to fn through
+        remaining_budget() so downstream timeouts shrink by the queue wait.
+        """
+        lane = self.lanes[lane_name]
+        arrived = time.monotonic()
+
+        await self._acquire(lane)
+
+        waited = time.monotonic() - arrived
+        lane.admitted += 1
+        lane.total_wait += waited
+        lane.max_wait = max(lane.max_wait, waited)
+        QUEUE_WAIT_SECONDS.observe(waited, lane=lane.name)
+
+        deadline = arrived + lane.deadline
+        started = time.monotonic()
+        # Carry context variables (e.g. the active trace) into the worker
+        ctx = contextvars.copy_context()
+        try:
+            job = asyncio.get_running_loop().run_in_executor(
+                self.executor, lambda: ctx.run(_call_with_deadline, deadline, fn, args, kwargs)
+            )
+        except BaseException:
+            self._release(lane)
+            raise
+
+        def finished(job):
+            # The slot is held until the worker thread is really done, even
+            # if the caller was cancelled (e.g. the client disconnected).
+            if not job.cancelled():
+                job.exception()  # retrieved here so an abandoned job does not log
+            lane.avg_service = 0.8 * lane.avg_service + 0.2 * (time.monotonic() - started)
+            self._release(lane)
+
+        job.add_done_callback(finished)
+        # Shielded: cancelling the caller must not mark the job done early
+        return await asyncio.shield(job)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "running": self._running,
+            "queued": sum(lane.queued for lane in self.lanes.values()),
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()},
+        }
+
+
+def _call_with_deadline(deadline, fn, args, kwargs):
+    _budget.deadline = deadline
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _budget.deadline = None
+
+
+def remaining_budget(default: float) -> float:
+    """
+    Seconds left before the current request's deadline, capped at default.
+    Outside a scheduled call this is simply default.
+    """
+    deadline = getattr(_budget, "deadline", None)
+    if deadline is None:
+        return default
+    return max(0.0, min(default, deadline - time.monotonic()))
@@ -0,0 +1,69 @@
+import json
+import os
+import faiss
+import numpy as np
+
+EXEMPLARS_PATH = os.getenv("SAFETY_EXEMPLARS", "../data/safety/exemplars.json")
+SEMANTIC_SAFETY_K = int(os.getenv("SEMANTIC_SAFETY_K", "5"))
+# Share of similarity mass that must come from unsafe exemplars to block
+SEMANTIC_SAFETY_THRESHOLD = float(os.getenv("SEMANTIC_SAFETY_THRESHOLD", "0.6"))
+# Below this cosine similarity a neighbour is too far away to count
+SEMANTIC_SAFETY_MIN_SIM = float(os.getenv("SEMANTIC_SAFETY_MIN_SIM", "0.55"))
+
+_index = None
+_labels = None
+
+
+def load_exemplars(embedder, path=EXEMPLARS_PATH):
+    """
+    Embed the labeled exemplars once and keep them in a small
+    inner-product FAISS index (cosine similarity on normalized vectors).
+    """
+    global _index, _labels
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Semantic safety disabled, could not load exemplars: {e}")
+        _index, _labels = None, None
+        return
+
+    texts = data.get("unsafe", []) + data.get("safe", [])
+    if not texts:
+        _index, _labels = None, None
+        return
+
+    vectors = embedder.encode(texts, convert_to_numpy=True).astype("float32")
+    faiss.normalize_L2(vectors)
+
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+
+    _index = index
+    _labels = np.array([1] * len(data.get("unsafe", [])) + [0] * len(data.get("safe", [])))
+    print(f"✅ Semantic safety loaded with {len(texts)} exemplars.")
+
+
+def classify(q_embed) -> dict:
+    """
+    Classify a query from its already computed embedding by a
+    similarity-weighted vote over the nearest exemplars.
+    """
+    if _index is None:
+        return {"safe": True, "score": 0.0}
+
+    q = np.array(q_embed, dtype="float32", copy=True).reshape(1, -1)
+    faiss.normalize_L2(q)
+
+    k = min(SEMANTIC_SAFETY_K, _index.ntotal)
+    sims, ids = _index.search(q, k)
+    sims, ids = sims[0], ids[0]
+
+    keep = sims >= SEMANTIC_SAFETY_MIN_SIM
+    if not keep.any():
+        return {"safe": True, "score": 0.0}
+
+    weights = sims[keep]
+    score = float((weights * _labels[ids[keep]]).sum() / weights.sum())
+    return {"safe": score < SEMANTIC_SAFETY_THRESHOLD, "score": score}
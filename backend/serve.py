@@ -0,0 +1,77 @@
+"""
+Preload-and-fork launcher: import the app (and with it every model) once
+in a parent process, then fork the API workers. The workers share the
+model weights copy-on-write instead of each loading their own.
+
+    python serve.py --workers 4 --port 8000
+
+Unix only. For the lowest memory per worker, combine with
+MODEL_SERVER_SOCKET and run model_server.py instead.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import uvicorn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with models preloaded before forking workers.")
+    parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print("⏳ Preloading models in the parent process ...")
+    import main as app_module
+    from rag_pipeline import load_exemplars
+    from utils.translation_service import preload_models
+
+    # Translators and exemplar embeddings are otherwise loaded lazily, in
+    # every worker separately; load them here so they are shared too.
+    # The workers' own startup preload then finds them already loaded.
+    preloading = preload_models()
+    if preloading:
+        preloading.join()
+    load_exemplars()
+
+    # Move everything allocated so far out of the GC's reach so collections
+    # in the workers do not touch (and copy) the shared pages.
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            config = uvicorn.Config(app_module.app, log_level="info")
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+    print(f"🚀 Started {len(children)} workers on {args.host}:{args.port}: {children}")
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for pid in children:
+        os.waitpid(pid, 0)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import json
+
+# Shape the model is asked to produce. Ollama is run with --format json,
+# which guarantees valid JSON but not this shape, so the parser below
+# tolerates missing or extra keys.
+JSON_INSTRUCTIONS = """Respond with JSON only, in exactly this shape:
+{"steps": ["<step 1>", "<step 2>", ...],
+ "checklist": [{"action": "<short action>", "how": "<how to do it>", "avoid": "<what to avoid>"}, ...]}
+Give at most 8 steps and at most 6 checklist rows."""
+
+# Checklist keys as the frontend expects them
+TABLE_KEYS = {"action": "Action", "how": "How to do it", "avoid": "What to avoid"}
+
+
+def to_table_row(row: dict) -> dict:
+    return {label: str(row.get(key, "") or "None").strip() for key, label in TABLE_KEYS.items()}
+
+
+class IncrementalAnswerParser:
+    """
+    Parse the answer JSON while it is still being generated.
+
+    feed() scans only the new characters and returns the items that were
+    completed by them: ("step", str) for every finished entry of "steps"
+    and ("row", dict) for every finished object of "checklist". Text before
+    the first "{" (e.g. stray reasoning) is skipped.
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.complete = False
+
+        self.last_key = None
+        self.string_start = None
+        self.array_key = None
+        self.item_start = None
+
+        self.steps = []
+        self.checklist = []
+
+    def feed(self, chunk: str):
+        events = []
+        self.buffer += chunk
+        text = self.buffer
+
+        while self.pos < len(text) and not self.complete:
+            i = self.pos
+            ch = text[i]
+            self.pos += 1
+
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    self._string_closed(i, events)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch in "{[":
+                if self.depth == 1 and ch == "[":
+                    self.array_key = self.last_key
+                elif self.depth == 2 and ch == "{" and self.array_key == "checklist":
+                    self.item_start = i
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 2 and ch == "}" and self.item_start is not None:
+                    self._emit(self.array_key, text[self.item_start:i + 1], events)
+                    self.item_start = None
+                elif self.depth == 1:
+                    self.array_key = None
+                elif self.depth == 0:
+                    self.complete = True
+
+        return events
+
+    def _string_closed(self, end, events):
+        raw = self.buffer[self.string_start:end + 1]
+        if self.depth == 1:
+            self.last_key = json.loads(raw)
+        elif self.depth == 2 and self.array_key == "steps":
+            self._emit("steps", raw, events)
+
+    def _emit(self, key, raw, events):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        if key == "steps" and isinstance(value, str) and value.strip():
+            self.steps.append(value.strip())
+            events.append(("step", value.strip()))
+        elif key == "checklist" and isinstance(value, dict):
+            row = to_table_row(value)
+            self.checklist.append(row)
+            events.append(("row", row))
+
+    def result(self) -> dict:
+        return {"steps": self.steps, "checklist": self.checklist}
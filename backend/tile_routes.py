@@ -0,0 +1,44 @@
+import os
+from fastapi import APIRouter, HTTPException, Request, Response
+import tiles
+
+router = APIRouter()
+
+# Tiles only change when preprocess_maps.py rebuilds a region; clients revalidate with the ETag after this
+TILE_MAX_AGE = int(os.getenv("TILE_MAX_AGE", "86400"))
+
+
+@router.get("/tiles/{region}/{z}/{x}/{y}.png")
+def get_tile(region: str, z: int, x: int, y: int, request: Request):
+    """Offline map tile rendered from the region's preprocessed road graph"""
+    try:
+        entry = tiles.get_tile(region, z, x, y)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    etag, data = entry
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={TILE_MAX_AGE}"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="image/png", headers=headers)
+
+
+@router.get("/tiles/{region}.json")
+def get_tilejson(region: str, request: Request):
+    """TileJSON for a region: tile URL template, zoom range and bounds"""
+    tile_url = str(request.base_url).rstrip("/") + f"/tiles/{region}/{{z}}/{{x}}/{{y}}.png"
+    try:
+        return tiles.tilejson(region, tile_url)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/tiles/cache")
+def tile_cache_stats():
+    return tiles.cache.stats()
@@ -0,0 +1,358 @@
+import io
+import math
+import os
+import re
+import sqlite3
+import threading
+import hashlib
+from collections import OrderedDict, defaultdict
+from metrics import CACHE_EVENTS
+
+# Directory holding the <region>.mbtiles files written by preprocess_maps.py
+MAPS_DIR = os.getenv("MAPS_DIR", "../data/maps")
+TILE_CACHE_MB = float(os.getenv("TILE_CACHE_MB", "64"))
+
+TILE_SIZE = 256
+BACKGROUND = "#f2efe9"
+ATTRIBUTION = "© OpenStreetMap contributors"
+
+# highway value -> (color, width in pixels at zoom 16, lowest zoom it is drawn at)
+ROAD_STYLES = {
+    "motorway": ("#e892a2", 8, 0),
+    "trunk": ("#f9b29c", 7, 0),
+    "primary": ("#fcd6a4", 6, 8),
+    "secondary": ("#f7fabf", 5, 10),
+    "tertiary": ("#ffffff", 4, 11),
+    "residential": ("#ffffff", 3, 13),
+    "unclassified": ("#ffffff", 3, 13),
+    "living_street": ("#ededed", 3, 13),
+    "pedestrian": ("#dddde8", 3, 13),
+    "service": ("#ffffff", 2, 14),
+    "track": ("#996600", 1, 14),
+    "footway": ("#fa8072", 1, 15),
+    "path": ("#fa8072", 1, 15),
+    "cycleway": ("#0000ff", 1, 15),
+    "steps": ("#fa8072", 1, 15),
+}
+DEFAULT_STYLE = ("#ffffff", 2, 14)
+CASING = "#bbbbbb"
+
+_REGION_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def mercator(lon, lat):
+    """
+    Web Mercator position in [0, 1) x [0, 1), y growing southwards.
+    """
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = (lon + 180.0) / 360.0
+    s = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return x, y
+
+
+def road_style(highway):
+    values = highway if isinstance(highway, list) else [highway]
+    styles = [ROAD_STYLES[v] for v in values if v in ROAD_STYLES]
+    # The most important class wins for ways tagged with several
+    return min(styles, key=lambda s: s[2]) if styles else DEFAULT_STYLE
+
+
+def _edge_lines(G):
+    """
+    Every road once, as (style, [(x, y), ...]) in Mercator units, drawn
+    least important first so major roads end up on top.
+    """
+    seen = set()
+    lines = []
+    for u, v, k, data in G.edges(keys=True, data=True):
+        key = (min(u, v), max(u, v), k)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        geometry = data.get("geometry")
+        if geometry is not None:
+            coords = list(geometry.coords)
+        else:
+            coords = [(G.nodes[u]["x"], G.nodes[u]["y"]), (G.nodes[v]["x"], G.nodes[v]["y"])]
+        lines.append((road_style(data.get("highway")), [mercator(lon, lat) for lon, lat in coords]))
+
+    lines.sort(key=lambda line: -line[0][2])
+    return lines
+
+
+def _segment_hits_box(x0, y0, x1, y1, xmin, ymin, xmax, ymax):
+    """
+    Whether the segment (x0, y0)-(x1, y1) passes through the box
+    (Liang-Barsky clipping).
+    """
+    t0, t1 = 0.0, 1.0
+    dx, dy = x1 - x0, y1 - y0
+    for p, q in ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            t0 = max(t0, t)
+        else:
+            t1 = min(t1, t)
+        if t0 > t1:
+            return False
+    return True
+
+
+def _tile_index(lines, zoom):
+    """
+    Which lines cross which tile at this zoom, as {(x, y): [line index]}.
+    Tiles are found per segment, so a long or bent road only lands in the
+    tiles it actually passes through, not in its whole bounding box.
+    """
+    scale = 2 ** zoom
+    index = defaultdict(list)
+    for i, (style, points) in enumerate(lines):
+        if style[2] > zoom:
+            continue
+        # Pad by the line width so strokes crossing a tile edge are drawn on both sides
+        pad = line_width(style, zoom) / TILE_SIZE
+        tiles = set()
+        scaled = [(x * scale, y * scale) for x, y in points]
+        for (x0, y0), (x1, y1) in zip(scaled, scaled[1:]):
+            for tx in range(max(0, int(min(x0, x1) - pad)), min(scale - 1, int(max(x0, x1) + pad)) + 1):
+                for ty in range(max(0, int(min(y0, y1) - pad)), min(scale - 1, int(max(y0, y1) + pad)) + 1):
+                    if (tx, ty) not in tiles and _segment_hits_box(
+                            x0, y0, x1, y1, tx - pad, ty - pad, tx + 1 + pad, ty + 1 + pad):
+                        tiles.add((tx, ty))
+        for tile in tiles:
+            index[tile].append(i)
+    return index
+
+
+def line_width(style, zoom):
+    return max(1, round(style[1] * 2 ** (zoom - 16)))
+
+
+def _render_tile(lines, line_ids, zoom, tx, ty):
+    from PIL import Image, ImageDraw
+
+    scale = 2 ** zoom * TILE_SIZE
+    image = Image.new("RGB", (TILE_SIZE, TILE_SIZE), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    ox, oy = tx * TILE_SIZE, ty * TILE_SIZE
+
+    projected = [
+        (lines[i][0], [(x * scale - ox, y * scale - oy) for x, y in lines[i][1]])
+        for i in line_ids
+    ]
+    # Casings first, then fills, so crossings look joined
+    for style, points in projected:
+        width = line_width(style, zoom)
+        if width >= 3:
+            draw.line(points, fill=CASING, width=width + 2, joint="curve")
+    for style, points in projected:
+        draw.line(points, fill=style[0], width=line_width(style, zoom), joint="curve")
+
+    buf = io.BytesIO()
+    image.quantize(colors=32).save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def render_mbtiles(G, out_path, region, min_zoom=10, max_zoom=15):
+    """
+    Render the road graph to PNG tiles and store them in an MBTiles file.
+    Tiles are rendered one zoom level at a time and written as they are
+    made, so memory stays bounded by the largest level's tile index. Tiles
+    without roads are not stored. Returns the number of tiles written.
+    """
+    lines = _edge_lines(G)
+    lons = [G.nodes[n]["x"] for n in G.nodes]
+    lats = [G.nodes[n]["y"] for n in G.nodes]
+    if not lons:
+        raise ValueError("Graph has no nodes to render")
+
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    try:
+        db.executescript("""
+            CREATE TABLE metadata (name TEXT, value TEXT);
+            CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+            CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+        """)
+        bounds = (min(lons), min(lats), max(lons), max(lats))
+        center = ((bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2)
+        db.executemany("INSERT INTO metadata VALUES (?, ?)", [
+            ("name", region),
+            ("format", "png"),
+            ("type", "baselayer"),
+            ("version", "1"),
+            ("minzoom", str(min_zoom)),
+            ("maxzoom", str(max_zoom)),
+            ("bounds", ",".join(f"{v:.6f}" for v in bounds)),
+            ("center", f"{center[0]:.6f},{center[1]:.6f},{min(max_zoom, max(min_zoom, 13))}"),
+            ("attribution", ATTRIBUTION),
+        ])
+
+        count = 0
+        for zoom in range(min_zoom, max_zoom + 1):
+            index = _tile_index(lines, zoom)
+            for (tx, ty), line_ids in index.items():
+                data = _render_tile(lines, line_ids, zoom, tx, ty)
+                # MBTiles rows are numbered from the south (TMS)
+                db.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                           (zoom, tx, 2 ** zoom - 1 - ty, sqlite3.Binary(data)))
+                count += 1
+            db.commit()
+            del index
+        db.close()
+        os.replace(tmp_path, out_path)
+        return count
+    except Exception:
+        db.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class TileCache:
+    """
+    Recently served tiles, bounded by total bytes and evicted in LRU order.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        CACHE_EVENTS.inc(cache="tile", result="miss" if entry is None else "hit")
+        return entry
+
+    def put(self, key, entry):
+        size = len(entry[1])
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            self.entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= len(evicted[1])
+
+    def stats(self):
+        with self.lock:
+            return {"tiles": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+cache = TileCache(int(TILE_CACHE_MB * 2**20))
+_local = threading.local()
+_blank = None
+
+
+def mbtiles_path(region: str) -> str:
+    if not _REGION_NAME.match(region):
+        raise ValueError(f"Invalid region name: {region!r}")
+    return os.path.join(MAPS_DIR, f"{region}.mbtiles")
+
+
+def _connection(region):
+    """
+    Read-only connection for this thread, reopened when preprocessing
+    replaced the file. Returns (connection, file version).
+    """
+    path = mbtiles_path(region)
+    try:
+        version = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No map tiles for region '{region}'") from None
+
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    current = connections.get(region)
+    if current is None or current[1] != version:
+        if current is not None:
+            current[0].close()
+        db = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+        current = connections[region] = (db, version)
+    return current
+
+
+def etag_for(data: bytes) -> str:
+    return '"' + hashlib.sha1(data).hexdigest()[:16] + '"'
+
+
+def blank_tile():
+    """
+    Background-only tile for areas of a region that have no roads.
+    """
+    global _blank
+    if _blank is None:
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new("RGB", (TILE_SIZE, TILE_SIZE), BACKGROUND).save(buf, format="PNG", optimize=True)
+        data = buf.getvalue()
+        _blank = (etag_for(data), data)
+    return _blank
+
+
+def get_tile(region, z, x, y):
+    """
+    (etag, png bytes) of an XYZ tile, the blank tile where the region has
+    no roads, or None outside the region's zoom range.
+    """
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return None
+    db, version = _connection(region)
+    key = (region, version, z, x, y)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    row = db.execute(
+        "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+        (z, x, 2 ** z - 1 - y),
+    ).fetchone()
+    if row is None:
+        minzoom, maxzoom = _zoom_range(db)
+        entry = blank_tile() if minzoom <= z <= maxzoom else None
+    else:
+        data = bytes(row[0])
+        entry = (etag_for(data), data)
+    if entry is not None:
+        cache.put(key, entry)
+    return entry
+
+
+def _zoom_range(db):
+    meta = dict(db.execute("SELECT name, value FROM metadata WHERE name IN ('minzoom', 'maxzoom')"))
+    return int(meta.get("minzoom", 0)), int(meta.get("maxzoom", 22))
+
+
+def tilejson(region, tile_url):
+    """
+    TileJSON description of a region's tiles for the map client.
+    """
+    db, _ = _connection(region)
+    meta = dict(db.execute("SELECT name, value FROM metadata"))
+    return {
+        "tilejson": "2.2.0",
+        "name": meta.get("name", region),
+        "attribution": meta.get("attribution", ATTRIBUTION),
+        "scheme": "xyz",
+        "tiles": [tile_url],
+        "minzoom": int(meta.get("minzoom", 0)),
+        "maxzoom": int(meta.get("maxzoom", 22)),
+        "bounds": [float(v) for v in meta["bounds"].split(",")] if "bounds" in meta else None,
+        "center": [float(v) for v in meta["center"].split(",")] if "center" in meta else None,
+    }
@@ -1,4 +1,10 @@
+import os
+import threading
+import time
+from collections import OrderedDict
 from transformers import MarianMTModel, MarianTokenizer
+from metrics import CACHE_EVENTS, MODEL_LOAD_SECONDS, MODEL_EVENTS, TRANSLATION_MODEL_BYTES
+from model_client import ModelClient
 
 MODELS = {
     "en": None,  
@@ -7,24 +13,142 @@ MODELS = {
     "es": "Helsinki-NLP/opus-mt-en-es",   # English <-> Spanish
 }
 
-loaded_models = {}
+# Reverse direction, only needed when queries are translated to English
+TO_EN_MODELS = {
+    "hi": "Helsinki-NLP/opus-mt-hi-en",
+    "ar": "Helsinki-NLP/opus-mt-ar-en",
+    "es": "Helsinki-NLP/opus-mt-es-en",
+}
+
+# UI language names -> language codes
+LANG_MAP = {"English": "en", "हिन्दी": "hi", "العربية": "ar", "Español": "es"}
+
+# Memory the loaded MarianMT models may use together before the least
+# recently used one is evicted
+TRANSLATION_MEMORY_BUDGET_MB = int(os.getenv("TRANSLATION_MEMORY_BUDGET_MB", "1200"))
+# Languages whose en->xx models are loaded in the background at startup, e.g. "hi,ar"
+TRANSLATION_PRELOAD = os.getenv("TRANSLATION_PRELOAD", "")
+
+# When set, translation runs in model_server.py instead of this process
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "")
+_client = ModelClient(MODEL_SERVER_SOCKET) if MODEL_SERVER_SOCKET else None
+
+def model_name_for(src, dest):
+    if src == dest:
+        return None
+    if src == "en":
+        return MODELS.get(dest)
+    if dest == "en":
+        return TO_EN_MODELS.get(src)
+    return None
+
+def model_bytes(model) -> int:
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
 
-def load_model(lang_code):
-    if lang_code not in loaded_models:
-        model_name = MODELS[lang_code]
-        if model_name:
+class ModelManager:
+    """
+    LRU cache of translation models bounded by a memory budget.
+
+    Concurrent requests for a model that is not loaded yet wait for a
+    single load instead of each calling from_pretrained. The most recently
+    loaded model is never evicted, even if it alone exceeds the budget.
+    """
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.models = OrderedDict()   # name -> (tokenizer, model, bytes)
+        self.loading = {}             # name -> Event set when the load ends
+        self.lock = threading.Lock()
+
+    def get(self, model_name):
+        while True:
+            with self.lock:
+                if model_name in self.models:
+                    self.models.move_to_end(model_name)
+                    CACHE_EVENTS.inc(cache="translation_model", result="hit")
+                    tokenizer, model, _ = self.models[model_name]
+                    return tokenizer, model
+                done = self.loading.get(model_name)
+                if done is None:
+                    done = self.loading[model_name] = threading.Event()
+                    break
+            # Another thread is loading it; re-check once it finishes
+            done.wait()
+
+        CACHE_EVENTS.inc(cache="translation_model", result="miss")
+        try:
+            start = time.perf_counter()
             tokenizer = MarianTokenizer.from_pretrained(model_name)
             model = MarianMTModel.from_pretrained(model_name)
-            loaded_models[lang_code] = (tokenizer, model)
-    return loaded_models.get(lang_code)
+            duration = time.perf_counter() - start
+            size = model_bytes(model)
 
-def translate_text(text, src="en", dest="en"):
-    # If source = dest, no translation
-    if src == dest or dest not in MODELS or not MODELS[dest]:
-        return text
+            MODEL_LOAD_SECONDS.set(duration, model=model_name)
+            MODEL_EVENTS.inc(model=model_name, event="load")
+            print(f"📦 Loaded {model_name} ({size / 2**20:.0f} MB) in {duration:.1f}s")
+
+            with self.lock:
+                self.models[model_name] = (tokenizer, model, size)
+                self._evict()
+            return tokenizer, model
+        finally:
+            with self.lock:
+                self.loading.pop(model_name).set()
 
-    tokenizer, model = load_model(dest)
-    tokens = tokenizer([text], return_tensors="pt", padding=True)
+    def _evict(self):
+        while len(self.models) > 1 and self.used_bytes() > self.budget_bytes:
+            name, _ = self.models.popitem(last=False)
+            MODEL_EVENTS.inc(model=name, event="evict")
+            print(f"♻️ Evicted {name} to stay within the translation memory budget")
+        TRANSLATION_MODEL_BYTES.set(self.used_bytes())
+
+    def used_bytes(self) -> int:
+        return sum(size for _, _, size in self.models.values())
+
+    def preload(self, model_names):
+        """
+        Load models on a background thread so the first request in those
+        languages does not pay for from_pretrained.
+        """
+        def run():
+            for name in model_names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠️ Preloading {name} failed: {e}")
+
+        thread = threading.Thread(target=run, name="translation-preload", daemon=True)
+        thread.start()
+        return thread
+
+manager = ModelManager(TRANSLATION_MEMORY_BUDGET_MB * 2**20)
+
+def load_model(model_name):
+    return manager.get(model_name)
+
+def preload_models(langs=TRANSLATION_PRELOAD):
+    """
+    Start background loading of the en->xx models for a comma-separated
+    list of language codes. Does nothing when translation is remote.
+    """
+    names = [MODELS.get(code.strip()) for code in langs.split(",")]
+    names = [name for name in names if name]
+    if _client or not names:
+        return None
+    return manager.preload(names)
+
+def translate_batch(texts, src="en", dest="en"):
+    # No model for this direction (or src = dest): leave texts as they are
+    model_name = model_name_for(src, dest)
+    if not model_name or not texts:
+        return list(texts)
+    if _client:
+        return _client.translate(texts, src, dest)
+
+    tokenizer, model = load_model(model_name)
+    tokens = tokenizer(list(texts), return_tensors="pt", padding=True)
     translated = model.generate(**tokens, max_length=512)
-    out = tokenizer.batch_decode(translated, skip_special_tokens=True)
-    return out[0]
+    return tokenizer.batch_decode(translated, skip_special_tokens=True)
+
+def translate_text(text, src="en", dest="en"):
+    return translate_batch([text], src=src, dest=dest)[0]
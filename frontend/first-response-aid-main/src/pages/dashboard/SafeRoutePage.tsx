@@ -37,6 +37,14 @@ interface SafeRouteResponse {
   }[];
 }
 
+interface TileJSON {
+  tiles: string[];
+  minzoom: number;
+  maxzoom: number;
+  attribution: string;
+  bounds?: [number, number, number, number] | null;
+}
+
 interface GeocodeResult {
   lat: string;
   lon: string;
@@ -54,9 +62,36 @@ const MapUpdater = ({ positions }: { positions: [number, number][] }) => {
   return null;
 };
 
-const SafeRouteMap = ({ route }: { route: [number, number][] }) => {
+const ONLINE_TILES = {
+  tiles: ["https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"],
+  minzoom: 0,
+  maxzoom: 19,
+  attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
+};
+
+// Offline tiles served by the backend for the region, online OSM tiles if it has none
+const useRegionTiles = (region: string) => {
+  const [tiles, setTiles] = useState<TileJSON>(ONLINE_TILES);
+  useEffect(() => {
+    if (!region) return;
+    let cancelled = false;
+    fetch(`${API_BASE_URL}/tiles/${region}.json`)
+      .then((res) => (res.ok ? res.json() : ONLINE_TILES))
+      .catch(() => ONLINE_TILES)
+      .then((tileJson) => { if (!cancelled) setTiles(tileJson); });
+    return () => { cancelled = true; };
+  }, [region]);
+  return tiles;
+};
+
+const SafeRouteMap = ({ route, region }: { route: [number, number][]; region: string }) => {
   const defaultCenter: [number, number] = [12.9716, 77.5946];
   const routeCenter = route && route.length > 0 ? route[0] : defaultCenter;
+  const tiles = useRegionTiles(region);
+  // TileJSON bounds are [west, south, east, north]; Leaflet wants [[south, west], [north, east]]
+  const tileBounds: L.LatLngBoundsExpression | undefined = tiles.bounds
+    ? [[tiles.bounds[1], tiles.bounds[0]], [tiles.bounds[3], tiles.bounds[2]]]
+    : undefined;
 
   return (
     <div className="h-[500px] w-full rounded-lg border border-border overflow-hidden">
@@ -67,8 +102,13 @@ const SafeRouteMap = ({ route }: { route: [number, number][] }) => {
         style={{ height: "100%", width: "100%" }}
       >
         <TileLayer
-          attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
-          url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
+          key={tiles.tiles[0]}
+          attribution={tiles.attribution}
+          url={tiles.tiles[0]}
+          minZoom={tiles.minzoom}
+          minNativeZoom={tiles.minzoom}
+          maxNativeZoom={tiles.maxzoom}
+          bounds={tileBounds}
         />
         {route && route.length > 0 && (
           <>
@@ -228,7 +268,7 @@ const SafeRoutePage = () => {
                                 <Loader2 className="h-12 w-12 mx-auto animate-spin text-primary" />
                             </div>
                         ) : response ? (
-                            <SafeRouteMap route={response.route_geometry} />
+                            <SafeRouteMap route={response.route_geometry} region={region} />
                         ) : (
                             <div className="h-[500px] flex items-center justify-center bg-muted/50 rounded-lg border border-border text-muted-foreground">
                                 Enter locations and click "Find Route"